@@ -2,7 +2,12 @@ import os
 import logging
 import asyncio
 import json
-from flask import Flask, render_template, request, jsonify
+import uuid
+import tempfile
+from itertools import chain
+from datetime import datetime
+import click
+from flask import Flask, render_template, request, jsonify, send_file, send_from_directory, url_for
 from flask_cors import CORS
 from urllib.parse import urlparse
 
@@ -53,12 +58,27 @@ from scrapers.dior import handle_dior
 # Utility modules
 from utils import get_public_ip, log_event
 from limit_checker import check_daily_limit
-from database import reset_scraping_limit, get_scraping_settings, get_all_scraped_products,get_all_scraped_logs
+from database import reset_scraping_limit, get_scraping_settings, get_all_scraped_products,get_all_scraped_logs, iter_products, get_pending_images, get_products_by_ids
 from ip_tracker import insert_scrape_log, update_scrape_status
+from site_config import load_websites, get_site_config
+from scraper_engine import EXCEL_DATA_PATH, IMAGE_SAVE_PATH, reparse_scrape
+from records import ProductRecord
+from workbook_cache import WorkbookQuery, cached_workbook, download_name
+from exporters import EXPORT_FORMATS, ExportError, export_format, export_records
+from image_backfill import ImageJob, get_backfill
+from page_archive import latest_scrape_id
+from selector_health import load_health
+from http_client import connection_stats
+from image_index import MAX_CANDIDATES, collapse_matches, get_hash_index
+from retention import run_retention, start_retention
 
 
 app = Flask(__name__)
 CORS(app)
+start_retention()
+
+# /export files are written per request and removed once sent; leftovers fall under retention
+EXPORT_TMP_PATH = os.path.join(EXCEL_DATA_PATH, "exports")
 
 # Ensure logs folder exists
 os.makedirs("logs", exist_ok=True)
@@ -83,11 +103,6 @@ def log_and_increment_request_count():
     logging.info(f"Total requests via proxy: {request_count}")
 
 
-def load_websites():
-    with open("websites.json", "r") as file:
-        return json.load(file)["websites"]
-
-
 @app.route("/")
 def main():
     websites = load_websites()
@@ -101,11 +116,16 @@ def fetch_data():
     
     id = request.json.get("id")
     url = request.json.get("url")
-    scrape_id = request.json.get("scrape_id")
+    scrape_id = request.json.get("scrape_id") or str(uuid.uuid4())
     name = request.json.get("name")
     region = request.json.get("region")
     type_User = request.json.get("type")
-    max_pages = int(request.json.get("maxPages", 1))
+    site_config = get_site_config(url)
+    max_pages = int(request.json.get("maxPages") or site_config.get("max_pages", 1))
+    try:
+        output_format = export_format(request.json.get("format"))
+    except ExportError as e:
+        return jsonify({"error": str(e)}), 400
 
     # print(id)
     # print(scrape_id)
@@ -174,8 +194,11 @@ def fetch_data():
         return jsonify({"error": "Unknown website"}), 200
 
     try:
-        base64_encoded, filename, file_path = asyncio.run(
-            handler(url, max_pages))
+        filename, file_path = asyncio.run(
+            handler(url, max_pages, scrape_id=scrape_id, export_format=output_format))
+    except ExportError as e:
+        update_scrape_status(scrape_id, 'error')
+        return jsonify({"status": False, "filename": None, "error": str(e)}), 400
     except Exception as e:
         update_scrape_status(scrape_id, 'error')
         log_event(f"Scraping failed for {domain}: {str(e)}")
@@ -183,7 +206,11 @@ def fetch_data():
 
     log_event(f"Successfully scraped {domain}. File generated: {filename}")
     update_scrape_status(scrape_id, 'inactive')
-    return jsonify({"status": True, "filename": filename})
+    if file_path:
+        download_url = url_for("download", filename=filename)
+    else:
+        download_url = url_for("workbook", scrape_id=scrape_id)
+    return jsonify({"status": True, "filename": filename, "download_url": download_url})
 
 
 @app.route("/reset-limit", methods=["GET"])
@@ -201,11 +228,146 @@ def get_data():
 def get_products():
     return jsonify(get_all_scraped_products())
 
+@app.route("/selector-health", methods=["GET"])
+def selector_health():
+    return jsonify(load_health())
+
+@app.route("/http-stats", methods=["GET"])
+def http_stats():
+    return jsonify(connection_stats())
+
+@app.route("/download/<path:filename>", methods=["GET"])
+def download(filename):
+    """Stream a generated workbook from disk; supports Range and If-None-Match/If-Modified-Since."""
+    return send_from_directory(EXCEL_DATA_PATH, filename, as_attachment=True, conditional=True, etag=True)
+
+def send_workbook(query):
+    file_path = asyncio.run(cached_workbook(query))
+    if not file_path:
+        return jsonify({"error": "No products match"}), 404
+    return send_file(file_path, as_attachment=True, download_name=download_name(query))
+
+@app.route("/workbook", methods=["GET"])
+def workbook():
+    """
+    Workbook of the products matching ?scrape_id=&retailer=&from=&to= (dates as
+    YYYY-MM-DD), rendered from the database on first request and cached until
+    the rows change.
+    """
+    try:
+        date_from, date_to = (
+            datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d") if value else None
+            for value in (request.args.get("from"), request.args.get("to"))
+        )
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+    query = WorkbookQuery(request.args.get("scrape_id"), request.args.get("retailer"), date_from, date_to)
+    if not any(query):
+        return jsonify({"error": "Give at least one of scrape_id, retailer, from, to"}), 400
+    return send_workbook(query)
+
+@app.route("/workbook/<scrape_id>", methods=["GET"])
+def scrape_workbook(scrape_id):
+    """A scrape's workbook, with whatever images are ready now."""
+    return send_workbook(WorkbookQuery(scrape_id))
+
+@app.route("/similar/<unique_id>", methods=["GET"])
+def similar(unique_id):
+    """
+    Products of other retailers whose image is within `distance` bits (perceptual hash)
+    of this product's image, one per retailer and product; ?same_retailer=1 keeps its own.
+    """
+    index = get_hash_index()
+    value = index.hash_of(unique_id)
+    if value is None:
+        return jsonify({"error": "No image hash for this product"}), 404
+    distance = request.args.get("distance", 6, type=int)
+    limit = request.args.get("limit", 50, type=int)
+    include_same_retailer = request.args.get("same_retailer", "0").lower() in ("1", "true", "yes")
+    matches = [(match_id, d) for match_id, d in index.query(value, distance, MAX_CANDIDATES) if match_id != unique_id]
+    products = get_products_by_ids([unique_id] + [match_id for match_id, _ in matches])
+    if unique_id not in products:
+        return jsonify({"error": "Unknown unique_id"}), 404
+    return jsonify({
+        "unique_id": unique_id,
+        "matches": collapse_matches(products[unique_id], matches, products, limit, include_same_retailer),
+    })
+
+@app.route("/export/<scrape_id>", methods=["GET"])
+def export(scrape_id):
+    """
+    Export a scrape's rows from the database as ?format=csv|ndjson|parquet|xlsx (default
+    csv). Rows are streamed into a file of this request's own, removed once it is sent;
+    workbooks come from the workbook cache.
+    """
+    try:
+        fmt = export_format(request.args.get("format", "csv"))
+    except ExportError as e:
+        return jsonify({"error": str(e)}), 400
+    if fmt == "xlsx":
+        return send_workbook(WorkbookQuery(scrape_id))
+    rows = iter_products(scrape_id=scrape_id)
+    first = next(rows, None)
+    if first is None:
+        return jsonify({"error": "Unknown scrape_id"}), 404
+    os.makedirs(EXPORT_TMP_PATH, exist_ok=True)
+    fd, file_path = tempfile.mkstemp(prefix=f"scrape_{scrape_id}_", suffix=f".{fmt}", dir=EXPORT_TMP_PATH)
+    os.close(fd)
+    try:
+        export_records((ProductRecord.from_db(row) for row in chain([first], rows)), fmt, file_path)
+    except Exception as e:
+        rows.close()
+        os.remove(file_path)
+        if isinstance(e, ExportError):
+            return jsonify({"error": str(e)}), 400
+        raise
+    response = send_file(file_path, as_attachment=True, download_name=f"scrape_{scrape_id}.{fmt}")
+    response.call_on_close(lambda: os.remove(file_path))
+    return response
+
 @app.route("/retailers", methods=["GET"])
 def get_retailers():
     return jsonify(get_all_scraped_logs())
 
 
+@app.cli.command("reparse")
+@click.argument("target")
+@click.option("--no-images", is_flag=True, help="Skip thumbnail downloads and stay fully offline.")
+@click.option("--format", "output_format", type=click.Choice(EXPORT_FORMATS), default="xlsx", help="Output file format.")
+def reparse_command(target, no_images, output_format):
+    """Re-extract an archived scrape (scrape_id, or the latest scrape of a URL) with the current selectors."""
+    scrape_id = latest_scrape_id(target) if target.startswith("http") else target
+    if not scrape_id:
+        raise click.ClickException(f"No archived scrape found for {target}")
+    filename, file_path = asyncio.run(reparse_scrape(
+        scrape_id, download_images=not no_images, export_format=output_format, inline_workbook=True))
+    get_backfill().wait()
+    log_event(f"Reparsed scrape {scrape_id}. File generated: {filename}")
+    click.echo(file_path)
+
+
+@app.cli.command("backfill-images")
+def backfill_images_command():
+    """Fetch images of rows left pending, e.g. after a restart during a backfill."""
+    rows = [row for row in get_pending_images() if row.get("ImageUrl")]
+    image_folder = os.path.join(IMAGE_SAVE_PATH, "backfill")
+    os.makedirs(image_folder, exist_ok=True)
+    get_backfill().submit(
+        ImageJob(row["unique_id"], row["ImageUrl"], None, os.path.join(image_folder, f"{row['unique_id']}.jpg"), row["ProductName"])
+        for row in rows
+    )
+    get_backfill().wait()
+    click.echo(f"Backfilled {len(rows)} images")
+
+
+@app.cli.command("retention")
+@click.option("--dry-run", is_flag=True, help="Only log what would be removed.")
+def retention_command(dry_run):
+    """Apply every retention rule now, without the background worker's per-tick batch limit."""
+    for name, (files, freed) in run_retention(dry_run=dry_run).items():
+        click.echo(f"{name}: {files} files, {freed / 1024 ** 2:.1f} MB")
+
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
     app.run(debug=True, port=5000)
@@ -0,0 +1,195 @@
+import re
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+# Typed attributes parsed from a product name. `kt` and `diamond_weight` are the
+# display strings written to the Kt and Total Dia wt columns.
+ProductAttributes = namedtuple(
+    "ProductAttributes",
+    ["metal", "karat", "carat", "confidence", "kt", "diamond_weight"],
+)
+
+MISSING = "N/A"
+EMPTY = ProductAttributes(None, None, None, 0.0, MISSING, MISSING)
+
+CARAT_QUANTUM = Decimal("0.001")
+
+# Colour words that may precede "gold", normalised to one spelling.
+GOLD_COLOURS = {
+    "white": "White", "yellow": "Yellow", "rose": "Rose", "pink": "Rose",
+    "red": "Rose", "two tone": "Two-Tone", "two-tone": "Two-Tone",
+    "tri colour": "Tri-Colour", "tri-colour": "Tri-Colour", "tri color": "Tri-Colour",
+    "tri-color": "Tri-Colour",
+}
+
+METAL_RE = re.compile(
+    r"\b(?:(?P<colour>white|yellow|rose|pink|red|two[- ]tone|tri[- ]colou?r)\s+)?"
+    r"(?P<metal>gold(?:\s+plated|\s+vermeil)?|platinum|palladium|sterling\s+silver|silver|"
+    r"titanium|tungsten|stainless\s+steel)\b",
+    re.IGNORECASE,
+)
+
+# 14K, 18kt, 9ct Gold, 14 karat, or blanc 18 carats. "ct"/"carats" only count as karat
+# next to a gold word (gold, or, oro), otherwise they are a carat weight.
+KARAT_RE = re.compile(
+    r"\b(?P<karat>[89]|1[0-9]|2[0-4])\s*(?:(?P<k>k|kt|karat)\b|(?P<ct>ct|carats?)\b)",
+    re.IGNORECASE,
+)
+GOLD_AFTER_RE = re.compile(r"\s*(?:white|yellow|rose|pink|red|solid)?\s*(?:gold|oro)\b", re.IGNORECASE)
+GOLD_BEFORE_RE = re.compile(
+    r"\b(?:gold|or|oro)(?:\s+(?:white|yellow|rose|pink|red|blanc|jaune|gris|bianco|giallo|rosa))?\s+$",
+    re.IGNORECASE,
+)
+
+# Hallmark fineness (585 = 14K, 750 = 18K ...) when no karat is written out.
+FINENESS_RE = re.compile(r"\b(?P<fineness>375|417|585|750|916|999)\b")
+FINENESS_KARAT = {"375": 9, "417": 10, "585": 14, "750": 18, "916": 22, "999": 24}
+
+# 1 1/2 ct tw, 1-1/2 CT. T.W., 3/4 ctw, 0.50 carat, 0,30 ct, .25 cttw, 2 carats total weight
+CARAT_RE = re.compile(
+    r"(?<![\w/.,])(?:(?P<whole>\d+)[\s-]+(?=\d+/\d+))?"
+    r"(?:(?P<num>\d+)/(?P<den>\d+)|(?P<dec>\d*\.\d+|\d+,\d+|\d+))"
+    r"\s*-?\s*(?P<unit>ct\.?\s*t\.?w\.?|cttw|ctw|tcw|ct|carats?)(?P<tw>\s*(?:tw|t\.w\.|total\s+weight))?\b",
+    re.IGNORECASE,
+)
+
+
+def _metal(text):
+    match = METAL_RE.search(text)
+    if not match:
+        return None
+    metal = " ".join(match.group("metal").split()).title()
+    colour = match.group("colour")
+    if colour and metal == "Gold":
+        metal = f"{GOLD_COLOURS[' '.join(colour.lower().split())]} Gold"
+    return metal
+
+
+def _karat_matches(text):
+    return [match for match in KARAT_RE.finditer(text)
+            if match.group("k") or GOLD_AFTER_RE.match(text, match.end())
+            or GOLD_BEFORE_RE.search(text, max(0, match.start() - 20), match.start())]
+
+
+def _karat(text, karat_matches):
+    if karat_matches:
+        match = karat_matches[0]
+        return int(match.group("karat")), 1.0 if match.group("k") else 0.8
+    match = FINENESS_RE.search(text)
+    if match:
+        return FINENESS_KARAT[match.group("fineness")], 0.6
+    return None, 0.0
+
+
+def _carat(text, karat_spans):
+    best = None
+    for match in CARAT_RE.finditer(text):
+        if any(start <= match.start() < end for start, end in karat_spans):
+            continue
+        if match.group("num"):
+            den = Decimal(match.group("den"))
+            if den == 0:
+                continue
+            value = Decimal(match.group("num")) / den
+        else:
+            # Decimal commas (0,30 ct) on the European sites
+            value = Decimal(match.group("dec").replace(",", "."))
+        if match.group("whole"):
+            value += Decimal(match.group("whole"))
+        if value <= 0:
+            continue
+
+        unit = match.group("unit").lower().replace(".", "").replace(" ", "")
+        total = bool(match.group("tw")) or unit in ("cttw", "ctw", "tcw")
+        candidate = (value.quantize(CARAT_QUANTUM, rounding=ROUND_HALF_UP), 1.0 if total else 0.8)
+        if total:
+            return candidate
+        if best is None:
+            best = candidate
+    return best or (None, 0.0)
+
+
+def format_carat(carat):
+    """Render a carat Decimal without trailing zeros, e.g. 0.500 -> "0.5 ct"."""
+    text = format(carat, "f").rstrip("0").rstrip(".")
+    return f"{text} ct"
+
+
+def parse_attributes(text):
+    """Parse metal, karat and carat weight out of one product name."""
+    if not text or text == MISSING:
+        return EMPTY
+
+    metal = _metal(text)
+    karat_matches = _karat_matches(text)
+    karat, karat_confidence = _karat(text, karat_matches)
+    carat, carat_confidence = _carat(text, [m.span() for m in karat_matches])
+
+    scores = [score for score in (1.0 if metal else 0.0, karat_confidence, carat_confidence) if score]
+    confidence = round(sum(scores) / len(scores), 2) if scores else 0.0
+
+    kt_parts = [f"{karat}K"] if karat else []
+    if metal:
+        kt_parts.append(metal)
+    kt = " ".join(kt_parts) or MISSING
+    diamond_weight = format_carat(carat) if carat is not None else MISSING
+
+    return ProductAttributes(metal, karat, carat, confidence, kt, diamond_weight)
+
+
+def parse_attributes_batch(texts):
+    """
+    Parse a whole page of product names in one call.
+
+    Repeated names (colour variants, cumulative pages) are parsed once.
+    """
+    cache = {}
+    results = []
+    for text in texts:
+        if text not in cache:
+            cache[text] = parse_attributes(text)
+        results.append(cache[text])
+    return results
+
+
+if __name__ == "__main__":
+    # Micro-benchmark: python attributes.py [repeat]
+    import sys
+    import timeit
+
+    templates = [
+        "1/2 ct tw Diamond Engagement Ring 14K White Gold",
+        "Lab-Grown Diamonds by KAY Necklace 1 1/2 ct tw 10K Yellow Gold 18\"",
+        "9ct Rose Gold 0.25 Carat Diamond Halo Pendant",
+        "Sterling Silver Cubic Zirconia Stud Earrings",
+        "Platinum Solitaire Ring 1.00ct",
+        "Bague or blanc 750 diamants 3/4 carat",
+        "Anello oro bianco 18kt con diamanti 0,30 ct",
+        "Men's Tungsten Band",
+    ]
+    # Distinct names, so neither parser is measured on cache hits
+    samples = [f"{template} Style {index}" for index in range(150) for template in templates]
+    # A cumulative load-more page repeats the names of the pages before it
+    page = samples[:300] * 4
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    def legacy():
+        # What each handler used to do: look the pattern strings up per product.
+        for name in samples:
+            re.search(r"\b\d+K\s+\w+\s+\w+\b", name)
+            re.search(r"\d+[-/]?\d*/?\d*\s*ct\s*tw", name)
+
+    def rate(func, count):
+        return count / min(timeit.repeat(func, number=1, repeat=repeat))
+
+    baseline = rate(legacy, len(samples))
+    for name, func, count in (("legacy per-product regex", legacy, len(samples)),
+                              ("parse_attributes", lambda: [parse_attributes(s) for s in samples], len(samples)),
+                              ("parse_attributes_batch", lambda: parse_attributes_batch(samples), len(samples)),
+                              ("batch, repeated page", lambda: parse_attributes_batch(page), len(page))):
+        names_per_second = baseline if func is legacy else rate(func, count)
+        print(f"{name:28s} {names_per_second:12,.0f} names/s {1e6 / names_per_second:8.2f} us/name "
+              f"({names_per_second / baseline:.2f}x legacy)")
+
+    for sample in templates:
+        print(sample, "->", parse_attributes(sample))
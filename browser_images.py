@@ -0,0 +1,85 @@
+import os
+import asyncio
+import logging
+from image_resolver import absolute_url, parse_srcset
+from image_store import get_image_store
+
+# The browser downloads every visible tile image while rendering the grid. With
+# BROWSER_IMAGES=1 (or `capture_images` in a site's websites.json entry) those
+# response bodies are kept and the ones belonging to extracted products go straight
+# into the image store, so the image backfill finds them without a second fetch.
+BROWSER_IMAGES = os.getenv("BROWSER_IMAGES", "0").lower() in ("1", "true", "yes")
+MAX_CAPTURE_BYTES = int(os.getenv("BROWSER_IMAGE_MAX_BYTES", 5 * 1024 * 1024))
+
+
+def capture_enabled(site):
+    return bool(site.get("capture_images", BROWSER_IMAGES))
+
+
+def candidate_urls(value, base_url):
+    """Absolute URLs of every srcset/src candidate in a product's image value."""
+    return [absolute_url(candidate.url, base_url) for candidate in parse_srcset(value)]
+
+
+class ImageCapture:
+    """Buffers image response bodies of one page until its products are known."""
+
+    def __init__(self, page):
+        self.page = page
+        self.bodies = {}
+        self._tasks = set()
+        page.on("response", self._on_response)
+
+    def _on_response(self, response):
+        if response.request.resource_type != "image" or response.status != 200:
+            return
+        if not response.headers.get("content-type", "").startswith("image/"):
+            return
+        task = asyncio.ensure_future(self._read(response))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _read(self, response):
+        try:
+            body = await response.body()
+        except Exception as e:
+            # The page navigated or closed before the body could be read
+            logging.debug(f"Could not capture {response.url}: {e}")
+            return
+        if body and len(body) <= MAX_CAPTURE_BYTES:
+            self.bodies[response.url] = (body, response.headers)
+
+    async def drain(self):
+        """Wait for pending body reads; call before the page or browser is closed."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def store(self, products, page_url):
+        """Put the captured bodies of the products' image candidates into the image store."""
+        image_store = get_image_store()
+        stored = 0
+        for product in products:
+            for url in candidate_urls(product.get("image_url"), page_url):
+                captured = self.bodies.pop(url, None)
+                if captured:
+                    body, headers = captured
+                    await asyncio.to_thread(image_store.put, url, body, headers, source="browser")
+                    stored += 1
+        logging.info(f"Reused {stored} image(s) the browser already loaded, {len(self.bodies)} unrelated dropped")
+        self.bodies.clear()
+        return stored
+
+
+def captured_candidate(value, base_url, thumbnail_url):
+    """
+    Keep thumbnail_url when the store has it; otherwise prefer another candidate of
+    the same image that the browser already delivered, so no download is needed.
+    """
+    image_store = get_image_store()
+    if thumbnail_url == "N/A" or image_store.lookup(thumbnail_url):
+        return thumbnail_url
+    for url in candidate_urls(value, base_url):
+        entry = image_store.lookup(url)
+        if entry and entry.get("source") == "browser":
+            return url
+    return thumbnail_url
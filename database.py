@@ -1,6 +1,7 @@
 import os
 import pymssql
 import logging
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from utils import log_event
 
@@ -33,11 +34,22 @@ def create_table():
                         Kt NVARCHAR(255),  
                         Price NVARCHAR(255),
                         TotalDiaWt NVARCHAR(255),
-                        Time DATETIME DEFAULT GETDATE()
+                        Time DATETIME DEFAULT GETDATE(),
+                        ImageUrl NVARCHAR(MAX),
+                        ImageStatus NVARCHAR(20),
+                        ScrapeId NVARCHAR(100),
+                        ImageHash CHAR(16)
                     )
                 END
                 """
                 cursor.execute(create_table_query)
+                # Columns added after the table was first deployed
+                for column, definition in (("ImageUrl", "NVARCHAR(MAX)"), ("ImageStatus", "NVARCHAR(20)"), ("ScrapeId", "NVARCHAR(100)"),
+                                           ("ImageHash", "CHAR(16)")):
+                    cursor.execute(f"""
+                        IF COL_LENGTH('dbo.IBM_Algo_Webstudy_Products', '{column}') IS NULL
+                            ALTER TABLE dbo.IBM_Algo_Webstudy_Products ADD {column} {definition} NULL
+                    """)
                 conn.commit()
                 logging.info("Table 'Products' checked/created successfully.")
     except pymssql.DatabaseError as e:
@@ -45,7 +57,7 @@ def create_table():
 
 
 def insert_into_db(data):
-    """Insert scraped data into the MSSQL database."""
+    """Insert scraped data into the MSSQL database; raises when the insert fails."""
     if not data:
         log_event("No data to insert into the database.")
         return
@@ -53,14 +65,216 @@ def insert_into_db(data):
         with pymssql.connect(**DB_CONFIG) as conn:
             with conn.cursor() as cursor:
                 query = """
-                    INSERT INTO dbo.IBM_Algo_Webstudy_Products (unique_id, CurrentDate, Header, ProductName, ImagePath, Kt, Price, TotalDiaWt)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    INSERT INTO dbo.IBM_Algo_Webstudy_Products
+                        (unique_id, CurrentDate, Header, ProductName, ImagePath, Kt, Price, TotalDiaWt, ImageUrl, ImageStatus, ScrapeId)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """
                 cursor.executemany(query, data)
                 conn.commit()
                 logging.info(f"Inserted {len(data)} records successfully.")
     except pymssql.DatabaseError as e:
         logging.error(f"Database error: {e}")
+        raise
+
+
+def replace_scrape_products(scrape_id, data):
+    """
+    Swap every stored row of a scrape for data in one transaction, e.g. after a reparse.
+    Raises on failure, in which case the previous rows are left untouched.
+    """
+    try:
+        with pymssql.connect(**DB_CONFIG) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("DELETE FROM dbo.IBM_Algo_Webstudy_Products WHERE ScrapeId = %s", (scrape_id,))
+                deleted = cursor.rowcount
+                if data:
+                    cursor.executemany("""
+                        INSERT INTO dbo.IBM_Algo_Webstudy_Products
+                            (unique_id, CurrentDate, Header, ProductName, ImagePath, Kt, Price, TotalDiaWt, ImageUrl, ImageStatus, ScrapeId)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    """, data)
+                conn.commit()
+                logging.info(f"Replaced {deleted} records of scrape {scrape_id} with {len(data)}.")
+    except pymssql.DatabaseError as e:
+        logging.error(f"Database error: {e}")
+        raise
+
+
+def update_image_status(rows):
+    """Apply image backfill results: rows of (image_path, image_status, image_hash, unique_id)."""
+    if not rows:
+        return
+    try:
+        with pymssql.connect(**DB_CONFIG) as conn:
+            with conn.cursor() as cursor:
+                cursor.executemany(
+                    "UPDATE dbo.IBM_Algo_Webstudy_Products SET ImagePath = %s, ImageStatus = %s, ImageHash = %s WHERE unique_id = %s",
+                    rows,
+                )
+                conn.commit()
+                logging.info(f"Updated images of {len(rows)} records.")
+    except pymssql.DatabaseError as e:
+        logging.error(f"Database error: {e}")
+
+
+def _like_literal(text):
+    """Escape SQL Server LIKE wildcards."""
+    return text.replace("[", "[[]").replace("%", "[%]").replace("_", "[_]")
+
+
+def retailer_url_patterns(retailer):
+    """LIKE patterns matching the scraping log URLs whose host is exactly retailer's domain (with or without www.)."""
+    host = (urlparse(retailer).netloc if "://" in retailer else retailer.split("/")[0]).lower()
+    host = _like_literal(host[4:] if host.startswith("www.") else host)
+    return [f"%://{prefix}{host}{suffix}" for prefix in ("", "www.") for suffix in ("", "/%", "?%")]
+
+
+def product_filters(scrape_id=None, retailer=None, date_from=None, date_to=None):
+    """
+    WHERE clause and parameters selecting products by scrape, retailer and CurrentDate
+    range. The retailer is the exact scraping log name or the exact host of its URL,
+    so "kay" or "kay.com" does not also select kayoutlet.com.
+    """
+    clauses, params = [], []
+    if scrape_id:
+        clauses.append("ScrapeId = %s")
+        params.append(scrape_id)
+    if retailer:
+        patterns = retailer_url_patterns(retailer)
+        url_clauses = " OR ".join(["url LIKE %s"] * len(patterns))
+        clauses.append(f"""ScrapeId IN (SELECT scrape_id FROM dbo.IBM_Algo_Webstudy_scraping_logs
+                                        WHERE name = %s OR {url_clauses})""")
+        params.extend([retailer, *patterns])
+    if date_from:
+        clauses.append("CurrentDate >= %s")
+        params.append(date_from)
+    if date_to:
+        clauses.append("CurrentDate < DATEADD(day, 1, %s)")
+        params.append(date_to)
+    return " AND ".join(clauses) or "1 = 1", tuple(params)
+
+
+def get_products_fingerprint(**filters):
+    """(row count, latest Time, ready images) of the matching products, or None on error."""
+    where, params = product_filters(**filters)
+    try:
+        with pymssql.connect(**DB_CONFIG) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT COUNT(*), MAX(Time), SUM(CASE WHEN ImageStatus = 'ready' THEN 1 ELSE 0 END)
+                    FROM dbo.IBM_Algo_Webstudy_Products
+                    WHERE {where}
+                """, params)
+                return tuple(cursor.fetchone())
+    except pymssql.Error as e:
+        logging.error(f"Database error: {e}")
+        return None
+
+
+def iter_products(batch_size=1000, **filters):
+    """Yield the matching product rows (as dicts) in insertion order, fetched in batches."""
+    where, params = product_filters(**filters)
+    try:
+        with pymssql.connect(**DB_CONFIG) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                cursor.execute(f"""
+                    SELECT [unique_id], [CurrentDate], [Header], [ProductName], [ImagePath], [Kt],
+                        [Price], [TotalDiaWt], [Time], [ImageUrl], [ImageStatus], [ScrapeId]
+                    FROM dbo.IBM_Algo_Webstudy_Products
+                    WHERE {where}
+                    ORDER BY Time
+                """, params)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+    except pymssql.Error as e:
+        logging.error(f"Database error: {e}")
+
+
+def get_pending_images(limit=5000):
+    """Rows whose image was never fetched, e.g. because the process stopped mid-backfill."""
+    try:
+        with pymssql.connect(**DB_CONFIG) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                cursor.execute("""
+                    SELECT TOP (%s) [unique_id], [ProductName], [ImageUrl], [ScrapeId]
+                    FROM dbo.IBM_Algo_Webstudy_Products
+                    WHERE ImageStatus = 'pending'
+                """, (limit,))
+                return cursor.fetchall()
+    except pymssql.Error as e:
+        logging.error(f"Database error: {e}")
+        return []
+
+
+def get_recent_image_paths(days):
+    """ImagePath of every row stored in the last `days` days, or None when the database cannot be read."""
+    try:
+        with pymssql.connect(**DB_CONFIG) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT DISTINCT [ImagePath]
+                    FROM dbo.IBM_Algo_Webstudy_Products
+                    WHERE Time >= DATEADD(day, -%s, GETDATE()) AND ImagePath IS NOT NULL AND ImagePath <> 'N/A'
+                """, (days,))
+                return {row[0] for row in cursor.fetchall()}
+    except pymssql.Error as e:
+        logging.error(f"Database error: {e}")
+        return None
+
+
+def iter_image_hashes(batch_size=10000):
+    """Yield (unique_id, ImageHash) for every product with a perceptual hash, fetched in batches."""
+    try:
+        with pymssql.connect(**DB_CONFIG) as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT [unique_id], [ImageHash]
+                    FROM dbo.IBM_Algo_Webstudy_Products
+                    WHERE ImageHash IS NOT NULL
+                """)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+    except pymssql.Error as e:
+        logging.error(f"Database error: {e}")
+
+
+def get_products_by_ids(unique_ids, batch_size=1000):
+    """
+    Product rows for the given unique_ids, keyed by unique_id, with the Retailer name
+    and RetailerUrl of their scrape from the scraping logs.
+    """
+    unique_ids = list(unique_ids)
+    products = {}
+    try:
+        with pymssql.connect(**DB_CONFIG) as conn:
+            with conn.cursor(as_dict=True) as cursor:
+                # SQL Server accepts at most 2100 parameters per statement
+                for start in range(0, len(unique_ids), batch_size):
+                    batch = unique_ids[start:start + batch_size]
+                    placeholders = ", ".join(["%s"] * len(batch))
+                    cursor.execute(f"""
+                        SELECT p.[unique_id], p.[CurrentDate], p.[Header], p.[ProductName], p.[ImagePath], p.[Kt],
+                            p.[Price], p.[TotalDiaWt], p.[ImageUrl], p.[ScrapeId], p.[ImageHash],
+                            l.[name] AS Retailer, l.[url] AS RetailerUrl
+                        FROM dbo.IBM_Algo_Webstudy_Products p
+                        LEFT JOIN (
+                            SELECT scrape_id, MAX(name) AS name, MAX(url) AS url
+                            FROM dbo.IBM_Algo_Webstudy_scraping_logs
+                            GROUP BY scrape_id
+                        ) l ON l.scrape_id = p.ScrapeId
+                        WHERE p.unique_id IN ({placeholders})
+                    """, tuple(batch))
+                    products.update((row["unique_id"], row) for row in cursor.fetchall())
+        return products
+    except pymssql.Error as e:
+        logging.error(f"Database error: {e}")
+        return {}
 
 
 # Function to fetch scraping settings
@@ -0,0 +1,123 @@
+import os
+import csv
+import json
+import uuid
+from records import EXPORT_FIELDS
+
+try:
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+# Table exports for downstream jobs that would otherwise parse our workbooks back
+# into rows. Every exporter appends each page's records as it completes, writing to
+# a .part file of its own that is moved into place by close(), so nothing is held
+# in memory and readers never see a partial export.
+EXPORT_FORMATS = ("xlsx", "csv", "ndjson", "parquet")
+
+
+class ExportError(ValueError):
+    pass
+
+
+class Exporter:
+    extension = None
+
+    def __init__(self, path):
+        self.path = path
+        # Unique per writer, so concurrent exports to one path never share a temp file
+        self.tmp_path = f"{path}.{uuid.uuid4().hex[:8]}.part"
+        self.rows = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def write(self, records):
+        rows = [record.export_row() for record in records]
+        if rows:
+            self._write(rows)
+            self.rows += len(rows)
+
+    def close(self):
+        self._close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+
+class CsvExporter(Exporter):
+    extension = "csv"
+
+    def __init__(self, path):
+        super().__init__(path)
+        # utf-8-sig so Excel opens accented product names correctly
+        self._file = open(self.tmp_path, "w", newline="", encoding="utf-8-sig")
+        self._writer = csv.DictWriter(self._file, fieldnames=EXPORT_FIELDS)
+        self._writer.writeheader()
+
+    def _write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class NdjsonExporter(Exporter):
+    extension = "ndjson"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = open(self.tmp_path, "w", encoding="utf-8")
+
+    def _write(self, rows):
+        self._file.writelines(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in rows)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class ParquetExporter(Exporter):
+    """One row group per written page; every column is a nullable string."""
+    extension = "parquet"
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise ExportError("Parquet export needs pyarrow (pip install pyarrow)")
+        super().__init__(path)
+        self._schema = pyarrow.schema([(field, pyarrow.string()) for field in EXPORT_FIELDS])
+        self._writer = parquet.ParquetWriter(self.tmp_path, self._schema, compression="zstd")
+
+    def _write(self, rows):
+        columns = {field: [None if row[field] is None else str(row[field]) for row in rows] for field in EXPORT_FIELDS}
+        self._writer.write_table(pyarrow.Table.from_pydict(columns, schema=self._schema))
+
+    def _close(self):
+        self._writer.close()
+
+
+EXPORTERS = {exporter.extension: exporter for exporter in (CsvExporter, NdjsonExporter, ParquetExporter)}
+
+
+def export_format(value):
+    """Validate a requested format (None means the default workbook)."""
+    value = (value or "xlsx").lower()
+    if value not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format {value!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+    return value
+
+
+def open_exporter(fmt, path):
+    return EXPORTERS[fmt](path)
+
+
+def export_records(records, fmt, path, chunk_size=1000):
+    """Write records (any iterable) to path in chunks; returns the path."""
+    exporter = open_exporter(fmt, path)
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            exporter.write(chunk)
+            chunk = []
+    exporter.write(chunk)
+    return exporter.close()
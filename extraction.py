@@ -0,0 +1,93 @@
+import logging
+
+# Runs inside the page: one round trip returns every tile's fields as plain objects.
+EXTRACT_TILES_JS = """
+([tileSelector, fields, missing]) => {
+    const absolute = (value) => {
+        if (!value) return value;
+        if (value.startsWith('//')) return 'https:' + value;
+        if (value.startsWith('/') || value.startsWith('./')) {
+            try { return new URL(value, document.baseURI).href; } catch (e) { return value; }
+        }
+        return value;
+    };
+    const candidates = (el) => {
+        // Every image URL the element offers: <picture> sources, srcsets, then lazy-load and plain src attributes.
+        const parts = [];
+        const picture = el.closest('picture');
+        if (picture) {
+            for (const source of picture.querySelectorAll('source')) {
+                const value = source.getAttribute('srcset') || source.getAttribute('data-srcset');
+                if (value) parts.push(value);
+            }
+        }
+        for (const name of ['srcset', 'data-srcset', 'data-lazy-srcset', 'data-src', 'data-lazy-src', 'src']) {
+            const value = el.getAttribute(name);
+            if (value && !value.startsWith('data:')) parts.push(value);
+        }
+        return parts.join('\\n');
+    };
+    const read = (el, attr) => {
+        if (attr === 'candidates') return candidates(el);
+        if (attr === 'text') return (el.innerText || el.textContent || '').replace(/\\s+/g, ' ').trim();
+        if (attr === 'html') return el.innerHTML;
+        const value = el.getAttribute(attr);
+        return value === null ? '' : value.trim();
+    };
+    return Array.from(document.querySelectorAll(tileSelector)).map((tile) => {
+        const record = {};
+        for (const [name, spec] of Object.entries(fields)) {
+            const el = spec.selector ? tile.querySelector(spec.selector) : tile;
+            let value = '';
+            if (el) {
+                for (const attr of spec.attrs) {
+                    value = read(el, attr);
+                    if (value) break;
+                }
+            }
+            if (value && spec.url) value = absolute(value);
+            record[name] = value || missing;
+        }
+        return record;
+    });
+}
+"""
+
+
+def normalize_fields(fields):
+    """
+    Expand a selector map into the form the in-page script expects.
+
+    Each field is either a CSS selector (its text is read) or a dict with
+    `selector`, `attr` (one attribute name or a fallback list; "text" and "html"
+    read the element's content, "candidates" collects every srcset/src of an image
+    and its <picture> for image_resolver) and `url` (make the value absolute).
+    An empty selector reads from the tile element itself.
+    """
+    normalized = {}
+    for name, spec in fields.items():
+        if isinstance(spec, str):
+            spec = {"selector": spec}
+        attrs = spec.get("attr", "text")
+        if isinstance(attrs, str):
+            attrs = [attrs]
+        normalized[name] = {
+            "selector": spec.get("selector") or "",
+            "attrs": list(attrs),
+            "url": bool(spec.get("url", False)),
+        }
+    return normalized
+
+
+async def extract_tiles(page, tile_selector, fields, missing="N/A"):
+    """
+    Extract every tile matching tile_selector in a single page.evaluate call.
+
+    Returns a list of plain dicts keyed by the field names in `fields`; fields
+    that are absent on a tile are set to `missing`.
+    """
+    try:
+        return await page.evaluate(EXTRACT_TILES_JS, [tile_selector, normalize_fields(fields), missing])
+    except Exception as e:
+        logging.error(f"Bulk tile extraction failed for {tile_selector}: {e}")
+        return []
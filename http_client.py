@@ -0,0 +1,101 @@
+import os
+import asyncio
+import logging
+import weakref
+from urllib.parse import urlparse
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = os.getenv("HTTP2", "1").lower() in ("1", "true", "yes")
+except ImportError:
+    HTTP2 = False
+
+# One pooled client serves every image download. httpx connections cannot cross event
+# loops, so there is a client per loop; downloads all run on the image backfill's
+# long-lived loop, so in practice one client and its keep-alive connections last for
+# the life of the process.
+MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 64))
+MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", 32))
+KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 30))
+
+LIMITS = httpx.Limits(
+    max_connections=MAX_CONNECTIONS,
+    max_keepalive_connections=MAX_KEEPALIVE,
+    keepalive_expiry=KEEPALIVE_EXPIRY,
+)
+TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "image/avif,image/webp,image/apng,image/*,*/*;q=0.8",
+}
+
+_clients = weakref.WeakKeyDictionary()
+
+# host -> {"requests", "connections", "tls_handshakes", "http2"}
+_stats = {}
+
+
+def _host_stats(host):
+    return _stats.setdefault(host, {"requests": 0, "connections": 0, "tls_handshakes": 0, "http2": 0})
+
+
+class MeteredTransport(httpx.AsyncHTTPTransport):
+    """Counts new TCP connections and TLS handshakes per host via httpcore trace events."""
+
+    async def handle_async_request(self, request):
+        stats = _host_stats(request.url.host)
+        stats["requests"] += 1
+
+        async def trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                stats["connections"] += 1
+            elif event_name == "connection.start_tls.complete":
+                stats["tls_handshakes"] += 1
+            elif event_name == "http2.send_request_headers.started":
+                stats["http2"] += 1
+
+        request.extensions["trace"] = trace
+        return await super().handle_async_request(request)
+
+
+def get_client():
+    """Return the pooled AsyncClient of the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            transport=MeteredTransport(http2=HTTP2, limits=LIMITS, retries=0),
+            headers=HEADERS,
+            timeout=TIMEOUT,
+            follow_redirects=True,
+        )
+        _clients[loop] = client
+    return client
+
+
+def connection_stats(url=None):
+    """
+    Per-host request, connection and handshake counts, with the share of requests
+    that reused a pooled connection. Pass url to get the numbers of one host.
+    """
+    report = {}
+    for host, stats in _stats.items():
+        requests = stats["requests"]
+        reused = max(requests - stats["connections"], 0)
+        report[host] = {**stats, "reused": reused, "reuse_ratio": round(reused / requests, 3) if requests else 0.0}
+    if url:
+        return report.get(urlparse(url).hostname, {})
+    return report
+
+
+def log_connection_stats(hosts=None):
+    """Log the cumulative numbers of the given hosts (all hosts by default)."""
+    for host, stats in sorted(connection_stats().items()):
+        if hosts is not None and host not in hosts:
+            continue
+        logging.info(
+            f"HTTP {host}: {stats['requests']} requests, {stats['connections']} connections, "
+            f"{stats['tls_handshakes']} TLS handshakes, {stats['reuse_ratio']:.0%} reused, {stats['http2']} over HTTP/2"
+        )
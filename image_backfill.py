@@ -0,0 +1,105 @@
+import queue
+import asyncio
+import logging
+import threading
+from urllib.parse import urlparse
+from collections import namedtuple
+from records import IMAGE_FAILED, IMAGE_READY
+from http_client import get_client, log_connection_stats
+from image_pipeline import ImagePipeline
+from thumbnails import thumbnail_hash
+from image_index import hash_hex, index_hash
+from database import update_image_status
+
+# Images are fetched after their rows are stored, on a background thread with its
+# own long-lived event loop and HTTP client, so a slow CDN never delays a scrape's
+# data and keep-alive connections to each CDN are reused across batches. Batches run
+# in the order they were submitted; each one updates ImagePath/ImageStatus/ImageHash
+# as it goes and logs the connection numbers of the hosts it used.
+ImageJob = namedtuple("ImageJob", ["unique_id", "url", "fallback_url", "path", "label"])
+
+UPDATE_BATCH_SIZE = 50
+
+
+class ImageBackfill:
+    """Single background worker that downloads queued ImageJobs and records the results."""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, jobs, on_done=None):
+        """
+        Queue a batch of ImageJobs. on_done, when given, is awaited on the worker loop
+        with {unique_id: (image_path, image_status)} after the batch; an empty batch
+        just runs on_done once every earlier batch has finished.
+        """
+        self._queue.put((list(jobs), on_done))
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="image-backfill", daemon=True)
+                self._thread.start()
+
+    def wait(self):
+        """Block until every submitted batch is done; for commands that exit afterwards."""
+        self._queue.join()
+
+    def _run(self):
+        # One loop for the thread's lifetime, so get_client() keeps returning the same pool
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        while True:
+            jobs, on_done = self._queue.get()
+            try:
+                loop.run_until_complete(self._process(jobs, on_done))
+            except Exception as e:
+                logging.error(f"Image backfill batch failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _fetch(self, pipeline, job):
+        image_path, digest = await pipeline.download(job.url, job.path, job.fallback_url, job.label)
+        if image_path == "N/A":
+            return job.unique_id, "N/A", IMAGE_FAILED, None
+        # Warm the thumbnail cache so the workbook render only has to embed, and
+        # hash the thumbnail for the similar-image index
+        _, image_hash = await thumbnail_hash(image_path, digest)
+        if image_hash is not None:
+            index_hash(job.unique_id, image_hash)
+        return job.unique_id, image_path, IMAGE_READY, image_hash
+
+    async def _process(self, jobs, on_done):
+        results = {}
+        if jobs:
+            pipeline = ImagePipeline(get_client())
+            updates = []
+            try:
+                for task in asyncio.as_completed([self._fetch(pipeline, job) for job in jobs]):
+                    unique_id, image_path, status, image_hash = await task
+                    results[unique_id] = (image_path, status)
+                    updates.append((image_path, status, None if image_hash is None else hash_hex(image_hash), unique_id))
+                    if len(updates) >= UPDATE_BATCH_SIZE:
+                        await asyncio.to_thread(update_image_status, updates)
+                        updates = []
+                await asyncio.to_thread(update_image_status, updates)
+            finally:
+                log_connection_stats({urlparse(url).hostname for job in jobs for url in (job.url, job.fallback_url) if url})
+            logging.info(
+                f"Image backfill: {pipeline.downloaded} downloaded, {pipeline.revalidated} not modified (304), "
+                f"{pipeline.reused} fresh in the image store, "
+                f"{sum(1 for _, status in results.values() if status == IMAGE_FAILED)} failed"
+            )
+        if on_done:
+            await on_done(results)
+
+
+_backfill = None
+
+
+def get_backfill():
+    """Return the process-wide ImageBackfill worker."""
+    global _backfill
+    if _backfill is None:
+        _backfill = ImageBackfill()
+    return _backfill
@@ -0,0 +1,167 @@
+import time
+import logging
+import threading
+from urllib.parse import urlparse
+from itertools import combinations
+from database import iter_image_hashes
+
+# Perceptual hashes (64-bit dHash of each product thumbnail, see thumbnails.dhash)
+# are kept in ImageHash and indexed here for near-duplicate lookups across retailers.
+# Multi-index hashing: the hash is split into CHUNKS 16-bit pieces, each with its own
+# table. Two hashes within Hamming distance d agree to within d // CHUNKS bits on at
+# least one piece, so probing every piece at that radius finds all matches while
+# touching only a few buckets, however many images are indexed.
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+MAX_DISTANCE = 10
+# Matches read from the index per /similar request before collapsing them
+MAX_CANDIDATES = 5000
+
+
+def hash_hex(value):
+    return f"{value:016x}"
+
+
+def chunks(value):
+    return [(value >> (i * CHUNK_BITS)) & CHUNK_MASK for i in range(CHUNKS)]
+
+
+def neighbours(chunk, radius):
+    """Every CHUNK_BITS-bit value within radius bit flips of chunk."""
+    yield chunk
+    for flips in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), flips):
+            value = chunk
+            for bit in bits:
+                value ^= 1 << bit
+            yield value
+
+
+class HashIndex:
+    """In-memory multi-index over product image hashes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = [{} for _ in range(CHUNKS)]  # chunk -> set of hashes
+        self._products = {}  # hash -> set of unique_ids
+        self._hashes = {}  # unique_id -> hash
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, unique_id, value):
+        with self._lock:
+            previous = self._hashes.get(unique_id)
+            if previous == value:
+                return
+            if previous is not None:
+                self._discard(unique_id, previous)
+            self._hashes[unique_id] = value
+            products = self._products.setdefault(value, set())
+            if not products:
+                for table, chunk in zip(self._tables, chunks(value)):
+                    table.setdefault(chunk, set()).add(value)
+            products.add(unique_id)
+
+    def remove(self, unique_id):
+        with self._lock:
+            value = self._hashes.pop(unique_id, None)
+            if value is not None:
+                self._discard(unique_id, value)
+
+    def _discard(self, unique_id, value):
+        products = self._products.get(value)
+        if products is None:
+            return
+        products.discard(unique_id)
+        if not products:
+            del self._products[value]
+            for table, chunk in zip(self._tables, chunks(value)):
+                bucket = table.get(chunk)
+                if bucket:
+                    bucket.discard(value)
+                    if not bucket:
+                        del table[chunk]
+
+    def hash_of(self, unique_id):
+        return self._hashes.get(unique_id)
+
+    def query(self, value, max_distance=6, limit=50):
+        """[(unique_id, distance)] of products within max_distance bits of value, closest first."""
+        max_distance = min(max_distance, MAX_DISTANCE)
+        radius = max_distance // CHUNKS
+        matches = {}
+        with self._lock:
+            for table, chunk in zip(self._tables, chunks(value)):
+                for probe in neighbours(chunk, radius):
+                    for candidate in table.get(probe, ()):
+                        if candidate not in matches:
+                            distance = bin(candidate ^ value).count("1")
+                            if distance <= max_distance:
+                                matches[candidate] = distance
+            results = [(unique_id, distance) for candidate, distance in matches.items()
+                       for unique_id in self._products.get(candidate, ())]
+        results.sort(key=lambda item: (item[1], item[0]))
+        return results[:limit]
+
+
+def retailer_key(row):
+    """Domain of the scrape's listing URL (or of the image URL when the scrape was not logged)."""
+    host = urlparse(row.get("RetailerUrl") or row.get("ImageUrl") or "").netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host or row.get("Retailer") or "unknown"
+
+
+def collapse_matches(source, matches, products, limit, include_same_retailer=False):
+    """
+    One result per retailer and product name: every weekly re-scrape of a product adds
+    another row with the same picture, which would otherwise fill the top results.
+    Rows of the source product's own retailer are left out unless include_same_retailer.
+    """
+    source_retailer = retailer_key(source)
+    best = {}
+    for unique_id, distance in matches:
+        row = products.get(unique_id)
+        if row is None:
+            continue
+        retailer = retailer_key(row)
+        if retailer == source_retailer and not include_same_retailer:
+            continue
+        key = (retailer, " ".join(str(row.get("ProductName") or "").lower().split()))
+        kept = best.get(key)
+        # Keep the closest match, and among equally close ones the latest scrape
+        if kept is None or distance < kept[1] or (
+                distance == kept[1] and str(row.get("CurrentDate")) > str(kept[0].get("CurrentDate"))):
+            best[key] = (row, distance)
+    results = sorted(best.items(), key=lambda item: (item[1][1], item[0]))
+    return [{**row, "RetailerDomain": key[0], "distance": distance} for key, (row, distance) in results[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_hash_index():
+    """Return the process-wide HashIndex, loading every stored hash on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            started = time.perf_counter()
+            index = HashIndex()
+            for unique_id, value in iter_image_hashes():
+                try:
+                    index.add(unique_id, int(value, 16))
+                except (TypeError, ValueError):
+                    continue
+            logging.info(f"Loaded {len(index)} image hashes in {time.perf_counter() - started:.2f}s")
+            _index = index
+    return _index
+
+
+def index_hash(unique_id, value):
+    """Add a freshly computed hash to the index if it is loaded; otherwise the next load reads it from the DB."""
+    if _index is not None:
+        _index.add(unique_id, value)
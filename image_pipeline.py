@@ -0,0 +1,154 @@
+import os
+import uuid
+import random
+import hashlib
+import asyncio
+import logging
+from urllib.parse import urlparse
+import httpx
+from image_store import cache_fields, conditional_headers, get_image_store, is_fresh
+
+# Downloads are bounded globally and per host, and bodies are streamed to disk in
+# chunks with the file writes done off the event loop, so a 1,000-tile grid neither
+# floods a CDN nor holds every image in memory while pages are still being read.
+# Finished files go to the content-addressed ImageStore and are hard-linked into the
+# run folder. URLs already in the store are linked without a request while fresh,
+# and revalidated with If-None-Match / If-Modified-Since once stale.
+IMAGE_CONCURRENCY = int(os.getenv("IMAGE_CONCURRENCY", 16))
+IMAGE_HOST_CONCURRENCY = int(os.getenv("IMAGE_HOST_CONCURRENCY", 6))
+IMAGE_RETRIES = int(os.getenv("IMAGE_RETRIES", 3))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+CHUNK_SIZE = 64 * 1024
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class RetryableStatus(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with full jitter, honouring a numeric Retry-After header."""
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+class ImagePipeline:
+    """
+    Bounded image downloader for one scrape.
+
+    download() may be scheduled for every tile at once; the semaphores decide how
+    many requests are actually in flight.
+    """
+
+    def __init__(self, client, concurrency=IMAGE_CONCURRENCY, host_concurrency=IMAGE_HOST_CONCURRENCY,
+                 retries=IMAGE_RETRIES, store=None):
+        self.client = client
+        self.store = store or get_image_store()
+        self.reused = 0
+        self.revalidated = 0
+        self.downloaded = 0
+        self.retries = retries
+        self.host_concurrency = host_concurrency
+        self._global = asyncio.Semaphore(concurrency)
+        self._hosts = {}
+
+    def _host_semaphore(self, url):
+        host = urlparse(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.host_concurrency)
+        return self._hosts[host]
+
+    async def _stream_to_file(self, url, path, headers=None):
+        """
+        Stream url into a temporary file next to path and return (tmp_path, sha256, headers).
+        tmp_path is None when a conditional request came back 304 Not Modified.
+        """
+        async with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 304:
+                return None, None, response.headers
+            if response.status_code in RETRY_STATUSES:
+                raise RetryableStatus(response.status_code, response.headers.get("retry-after"))
+            response.raise_for_status()
+
+            tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+            digest = hashlib.sha256()
+            f = await asyncio.to_thread(open, tmp_path, "wb")
+            try:
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    digest.update(chunk)
+                    await asyncio.to_thread(f.write, chunk)
+            except BaseException:
+                await asyncio.to_thread(f.close)
+                await asyncio.to_thread(os.remove, tmp_path)
+                raise
+            await asyncio.to_thread(f.close)
+            return tmp_path, digest.hexdigest(), response.headers
+
+    async def _store(self, url, tmp_path, digest, fields, path):
+        if tmp_path is not None:
+            await asyncio.to_thread(self.store.add, tmp_path, digest)
+        await asyncio.to_thread(self.store.remember, url, digest, **fields)
+        linked = await asyncio.to_thread(self.store.link, digest, path)
+        return digest if linked else None
+
+    async def _fetch(self, url, path, label):
+        """Fetch one URL with retries. Returns the content digest, or None when it could not be fetched."""
+        stored = await asyncio.to_thread(self.store.lookup, url)
+        request_headers = None
+        if stored:
+            if is_fresh(stored) and await asyncio.to_thread(self.store.link, stored["digest"], path):
+                self.reused += 1
+                return stored["digest"]
+            request_headers = conditional_headers(stored) or None
+
+        for attempt in range(self.retries):
+            retry_after = None
+            try:
+                async with self._global, self._host_semaphore(url):
+                    tmp_path, digest, headers = await self._stream_to_file(url, path, request_headers)
+                fields = cache_fields(headers)
+                if tmp_path is None:
+                    # 304: the stored copy is current; keep validators the server did not repeat
+                    self.revalidated += 1
+                    digest = stored["digest"]
+                    fields = {k: stored.get(k) if v is None else v for k, v in fields.items()}
+                else:
+                    self.downloaded += 1
+                return await self._store(url, tmp_path, digest, fields, path)
+            except httpx.HTTPStatusError as e:
+                logging.warning(f"HTTP {e.response.status_code} downloading {label} from {url}")
+                return None
+            except RetryableStatus as e:
+                retry_after = e.retry_after
+                logging.warning(f"Retry {attempt + 1}/{self.retries} - {e} downloading {label}")
+            except (httpx.RequestError, OSError) as e:
+                logging.warning(f"Retry {attempt + 1}/{self.retries} - Error downloading {label}: {e}")
+            if attempt < self.retries - 1:
+                # Back off outside the semaphores so waiting does not hold a slot
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+        return None
+
+    async def download(self, image_url, path, fallback_url=None, label=None):
+        """
+        Download image_url (or fallback_url if it is refused) to path.
+        Returns (path, digest), or ("N/A", None) when neither could be fetched.
+        """
+        if not image_url or image_url == "N/A":
+            return "N/A", None
+        label = label or image_url
+        candidates = [image_url] if fallback_url in (None, "N/A", image_url) else [image_url, fallback_url]
+        for candidate in candidates:
+            digest = await self._fetch(candidate, path, label)
+            if digest:
+                return path, digest
+        logging.error(f"Failed to download {label} after {self.retries} attempts.")
+        return "N/A", None
@@ -0,0 +1,174 @@
+import os
+import re
+from collections import namedtuple
+from urllib.parse import urljoin
+from pagination import set_query_params
+
+# Width (px) the downloaded image must reach. Workbooks show 100x100 pictures, so
+# 200 covers 2x displays; sites can override it with `image_target_width`.
+IMAGE_TARGET_WIDTH = int(os.getenv("IMAGE_TARGET_WIDTH", 200))
+
+ImageCandidate = namedtuple("ImageCandidate", ["url", "width", "density"])
+
+DESCRIPTOR_RE = re.compile(r"^(\d+(?:\.\d+)?)([wxh])$")
+
+
+def _srcset_entries(value):
+    """
+    Yield (url, descriptors) per the HTML srcset grammar: a URL runs to the next
+    whitespace (commas inside it, e.g. Cloudinary's w_200,h_300, are kept) and its
+    descriptors run to the next comma, so "a.jpg 1x,b.jpg 2x" is two candidates.
+    A token that is not a descriptor starts the next URL, which splits the
+    newline-joined srcsets and plain URLs of the `candidates` rule.
+    """
+    pos, end = 0, len(value)
+    while True:
+        while pos < end and (value[pos].isspace() or value[pos] == ","):
+            pos += 1
+        if pos >= end:
+            return
+        start = pos
+        while pos < end and not value[pos].isspace():
+            pos += 1
+        url = value[start:pos]
+        descriptors = []
+        if url.endswith(","):
+            yield url.rstrip(","), descriptors
+            continue
+        while True:
+            while pos < end and value[pos].isspace():
+                pos += 1
+            if pos >= end or value[pos] == ",":
+                pos += 1
+                break
+            start = pos
+            while pos < end and not value[pos].isspace() and value[pos] != ",":
+                pos += 1
+            token = value[start:pos]
+            if not DESCRIPTOR_RE.match(token):
+                pos = start
+                break
+            descriptors.append(token)
+        yield url, descriptors
+
+
+def parse_srcset(value):
+    """
+    Parse srcset text (or several srcsets / plain URLs separated by newlines, as
+    the `candidates` field rule returns them) into ImageCandidates.
+    """
+    candidates = []
+    if not value or value == "N/A":
+        return candidates
+    for url, descriptors in _srcset_entries(value):
+        if url.startswith("data:"):
+            continue
+        candidate = ImageCandidate(url, None, None)
+        for descriptor in descriptors:
+            number, kind = DESCRIPTOR_RE.match(descriptor).groups()
+            if kind == "w":
+                candidate = candidate._replace(width=int(float(number)))
+            elif kind == "x":
+                candidate = candidate._replace(density=float(number))
+        candidates.append(candidate)
+    return candidates
+
+
+def pick_candidate(candidates, target_width=IMAGE_TARGET_WIDTH):
+    """
+    Return the smallest candidate at least target_width wide, or the widest one
+    when none is large enough. Density descriptors prefer 1x, plain URLs come last.
+    """
+    if not candidates:
+        return None
+    sized = [c for c in candidates if c.width]
+    if sized:
+        large_enough = [c for c in sized if c.width >= target_width]
+        if large_enough:
+            return min(large_enough, key=lambda c: c.width)
+        return max(sized, key=lambda c: c.width)
+    dense = [c for c in candidates if c.density]
+    if dense:
+        at_least_one = [c for c in dense if c.density >= 1]
+        return min(at_least_one, key=lambda c: c.density) if at_least_one else max(dense, key=lambda c: c.density)
+    return candidates[0]
+
+
+def largest_candidate(candidates):
+    """Return the widest (or densest) candidate, falling back to the first plain URL."""
+    if not candidates:
+        return None
+    return max(candidates, key=lambda c: (c.width or 0, c.density or 0))
+
+
+def absolute_url(image_url, base_url):
+    if not image_url or image_url == "N/A" or image_url.startswith("data:"):
+        return "N/A"
+    if image_url.startswith("//"):
+        return "https:" + image_url
+    return urljoin(base_url, image_url)
+
+
+def rewrite_image_url(image_url, rewrites, target_width=IMAGE_TARGET_WIDTH):
+    """
+    Apply a list of URL rewrites from websites.json.
+
+    Each rewrite is either {"pattern", "replacement", "target"} where target is
+    "path" (default, the URL without its query string), "query" or "url", or
+    {"query_params": {...}} to set query parameters. "{width}" in a query param
+    value is replaced by target_width.
+    """
+    if not image_url or image_url == "N/A":
+        return image_url
+
+    for rewrite in rewrites or []:
+        if "query_params" in rewrite:
+            params = {k: str(v).format(width=target_width) for k, v in rewrite["query_params"].items()}
+            image_url = set_query_params(image_url, params)
+            continue
+
+        target = rewrite.get("target", "path")
+        if target == "url":
+            image_url = re.sub(rewrite["pattern"], rewrite["replacement"], image_url)
+            continue
+
+        path, _, query = image_url.partition("?")
+        if target == "query":
+            query = re.sub(rewrite["pattern"], rewrite["replacement"], query)
+        else:
+            path = re.sub(rewrite["pattern"], rewrite["replacement"], path)
+        image_url = f"{path}?{query}" if query else path
+    return image_url
+
+
+def split_rewrites(rewrites):
+    """Split rewrites into (thumbnail, archive) lists by their `apply_to` key."""
+    thumbnail, archive = [], []
+    for rewrite in rewrites or []:
+        apply_to = rewrite.get("apply_to", "archive")
+        if apply_to in ("thumbnail", "both"):
+            thumbnail.append(rewrite)
+        if apply_to in ("archive", "both"):
+            archive.append(rewrite)
+    return thumbnail, archive
+
+
+def resolve_image(value, base_url, rewrites=None, target_width=IMAGE_TARGET_WIDTH):
+    """
+    Resolve a tile's image value into (thumbnail_url, archive_url).
+
+    The thumbnail is the smallest candidate that still meets target_width and is
+    what gets downloaded. The archive URL is the largest candidate with the
+    site's high-res rewrites applied; it is only recorded, not fetched.
+    """
+    candidates = parse_srcset(value)
+    if not candidates:
+        return "N/A", "N/A"
+
+    thumbnail_rewrites, archive_rewrites = split_rewrites(rewrites)
+    thumbnail = absolute_url(pick_candidate(candidates, target_width).url, base_url)
+    archive = absolute_url(largest_candidate(candidates).url, base_url)
+    return (
+        rewrite_image_url(thumbnail, thumbnail_rewrites, target_width),
+        rewrite_image_url(archive, archive_rewrites, target_width),
+    )
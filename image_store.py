@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+# Downloaded images are kept once, named by the sha256 of their bytes, and every
+# run's static/Images/<timestamp>/ file is a hard link to that copy. urls.jsonl is
+# also an HTTP cache index: it keeps each URL's digest with its ETag, Last-Modified
+# and max-age so a re-scrape revalidates with conditional requests (mostly 304s).
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_STORE_PATH = os.getenv("IMAGE_STORE_PATH", os.path.join(BASE_DIR, "static", "ImageStore"))
+URL_INDEX = "urls.jsonl"
+
+# Freshness for responses without validators or Cache-Control (seconds, default 14 days)
+IMAGE_CACHE_TTL = int(os.getenv("IMAGE_CACHE_TTL", 14 * 24 * 3600))
+
+# Bodies captured from the browser were current when the page rendered; trust them
+# without revalidation for this long (seconds)
+BROWSER_CAPTURE_TTL = int(os.getenv("BROWSER_CAPTURE_TTL", 6 * 3600))
+
+# urls.jsonl is append-only; it is rewritten with one line per URL once superseded
+# lines outnumber the live ones (and at least this many have piled up)
+COMPACT_MIN_LINES = int(os.getenv("IMAGE_INDEX_COMPACT_LINES", 10000))
+
+MAX_AGE_RE = re.compile(r"(?:s-maxage|max-age)\s*=\s*(\d+)", re.IGNORECASE)
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def file_digest(path):
+    """sha256 of a file, i.e. its name in the store."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_or_copy(source, destination):
+    """Hard-link source to destination, copying when the filesystem cannot link."""
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def cache_fields(headers):
+    """Validators and freshness lifetime of an image response, for the URL index."""
+    cache_control = headers.get("cache-control", "")
+    max_age = None
+    if "no-cache" not in cache_control.lower() and "no-store" not in cache_control.lower():
+        ages = [int(age) for age in MAX_AGE_RE.findall(cache_control)]
+        max_age = max(ages) if ages else None
+    return {
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+        "max_age": max_age,
+    }
+
+
+def is_fresh(entry, ttl=IMAGE_CACHE_TTL):
+    """
+    True when a stored URL can be reused without asking the server: within its
+    max-age, or within ttl when the CDN gave neither max-age nor validators.
+    """
+    try:
+        age = (datetime.now() - datetime.fromisoformat(entry["fetched_at"])).total_seconds()
+    except (KeyError, ValueError):
+        return False
+    if entry.get("source") == "browser" and age < BROWSER_CAPTURE_TTL:
+        return True
+    if entry.get("max_age") is not None:
+        return age < entry["max_age"]
+    if entry.get("etag") or entry.get("last_modified"):
+        return False
+    return age < ttl
+
+
+def conditional_headers(entry):
+    """If-None-Match / If-Modified-Since headers for revalidating a stored URL."""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+class ImageStore:
+    """Content-addressed image files plus a URL -> digest index, shared by every run."""
+
+    def __init__(self, root=IMAGE_STORE_PATH):
+        self.root = root
+        self._lock = threading.Lock()
+        self._urls = None
+        self._lines = 0
+
+    def object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.jpg")
+
+    def _load_urls(self):
+        if self._urls is None:
+            self._urls = {}
+            self._lines = 0
+            path = os.path.join(self.root, URL_INDEX)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        self._lines += 1
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            continue
+                        self._urls[entry["key"]] = entry
+        return self._urls
+
+    def _compact(self):
+        """Rewrite urls.jsonl with the current entry of each URL whose object still exists. Hold the lock."""
+        urls = self._load_urls()
+        live = {key: entry for key, entry in urls.items() if os.path.exists(self.object_path(entry["digest"]))}
+        path = os.path.join(self.root, URL_INDEX)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        os.makedirs(self.root, exist_ok=True)
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in live.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_path, path)
+        logging.info(f"Compacted {URL_INDEX}: {self._lines} lines -> {len(live)}")
+        self._urls = live
+        self._lines = len(live)
+
+    def compact(self):
+        """Drop superseded lines and URLs of evicted objects from urls.jsonl."""
+        with self._lock:
+            self._compact()
+
+    def lookup(self, url):
+        """Index entry of a previously downloaded URL whose object is still on disk, or None."""
+        with self._lock:
+            entry = self._load_urls().get(url_key(url))
+        if entry and os.path.exists(self.object_path(entry["digest"])):
+            return entry
+        return None
+
+    def remember(self, url, digest, **extra):
+        """Map url to digest; later lines in urls.jsonl override earlier ones."""
+        entry = {"key": url_key(url), "url": url, "digest": digest,
+                 "fetched_at": datetime.now().isoformat(timespec="seconds"), **extra}
+        with self._lock:
+            urls = self._load_urls()
+            urls[entry["key"]] = entry
+            os.makedirs(self.root, exist_ok=True)
+            with open(os.path.join(self.root, URL_INDEX), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._lines += 1
+            if self._lines - len(urls) > max(COMPACT_MIN_LINES, len(urls)):
+                self._compact()
+        return entry
+
+    def add(self, tmp_path, digest):
+        """Move a downloaded file into the store, discarding it if the content is already there."""
+        path = self.object_path(digest)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return path
+
+    def put(self, url, data, headers, **extra):
+        """Store bytes obtained elsewhere (e.g. from the browser) as the current content of url."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.part"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        return self.remember(url, digest, **cache_fields(headers), **extra)
+
+    def link(self, digest, destination):
+        """Expose a stored image at destination (a run's static/Images path)."""
+        try:
+            link_or_copy(self.object_path(digest), destination)
+            return destination
+        except OSError as e:
+            logging.error(f"Failed to link stored image {digest} to {destination}: {e}")
+            return None
+
+
+_store = None
+
+
+def get_image_store():
+    """Return the process-wide ImageStore."""
+    global _store
+    if _store is None:
+        _store = ImageStore()
+    return _store
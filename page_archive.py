@@ -0,0 +1,151 @@
+import os
+import gzip
+import json
+import uuid
+import asyncio
+import hashlib
+import logging
+import threading
+from datetime import datetime
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Every rendered listing page and captured JSON response is stored compressed and
+# content-addressed, so a broken selector can be fixed and the scrape re-parsed
+# from disk (`flask reparse`) instead of re-fetched through the proxy.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARCHIVE_PATH = os.getenv("PAGE_ARCHIVE_PATH", os.path.join(BASE_DIR, "archive"))
+PAGE_ARCHIVE = os.getenv("PAGE_ARCHIVE", "1").lower() in ("1", "true", "yes")
+INDEX_FILE = "index.jsonl"
+
+CODEC = "zstd" if zstandard else "gzip"
+EXTENSIONS = {"zstd": ".zst", "gzip": ".gz"}
+
+_index_lock = threading.Lock()
+
+
+def compress(data, codec=CODEC):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("The archive entry is zstd-compressed but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def object_path(digest, codec, root=ARCHIVE_PATH):
+    return os.path.join(root, "objects", digest[:2], f"{digest}{EXTENSIONS[codec]}")
+
+
+def store_object(data, root=ARCHIVE_PATH):
+    """Store bytes under their sha256 and return (digest, codec). Identical content is written once."""
+    digest = hashlib.sha256(data).hexdigest()
+    for codec in EXTENSIONS:
+        if os.path.exists(object_path(digest, codec, root)):
+            return digest, codec
+
+    path = object_path(digest, CODEC, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write to a temporary name first so a crash never leaves a truncated object behind
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(compress(data))
+    os.replace(tmp_path, path)
+    return digest, CODEC
+
+
+def load_object(digest, codec, root=ARCHIVE_PATH):
+    with open(object_path(digest, codec, root), "rb") as f:
+        return decompress(f.read(), codec)
+
+
+def append_index(entry, root=ARCHIVE_PATH):
+    os.makedirs(root, exist_ok=True)
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _index_lock:
+        with open(os.path.join(root, INDEX_FILE), "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def read_index(root=ARCHIVE_PATH):
+    path = os.path.join(root, INDEX_FILE)
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logging.warning(f"Skipping corrupt archive index line: {line[:80]!r}")
+    return entries
+
+
+def scrape_entries(scrape_id, root=ARCHIVE_PATH):
+    """Index entries of one scrape in capture order."""
+    return [entry for entry in read_index(root) if entry["scrape_id"] == scrape_id]
+
+
+def latest_scrape_id(url, root=ARCHIVE_PATH):
+    """scrape_id of the most recent archived scrape of url, or None."""
+    scrape_id = None
+    for entry in read_index(root):
+        if entry["url"] == url:
+            scrape_id = entry["scrape_id"]
+    return scrape_id
+
+
+def load_entry(entry, root=ARCHIVE_PATH):
+    """Return the archived payload of an index entry: text for HTML pages, decoded JSON for API responses."""
+    data = load_object(entry["digest"], entry["codec"], root)
+    if entry["kind"] == "json":
+        return json.loads(data)
+    return data.decode("utf-8")
+
+
+class PageArchive:
+    """Archive writer for one scrape. Compression runs in a thread to keep the event loop free."""
+
+    def __init__(self, scrape_id, url, enabled=PAGE_ARCHIVE, root=ARCHIVE_PATH):
+        self.scrape_id = scrape_id or uuid.uuid4().hex
+        self.url = url
+        self.enabled = enabled
+        self.root = root
+        self.count = 0
+
+    async def _store(self, kind, source, page_url, data, page_title):
+        if not self.enabled:
+            return
+        try:
+            digest, codec = await asyncio.to_thread(store_object, data, self.root)
+            append_index({
+                "scrape_id": self.scrape_id,
+                "url": self.url,
+                "page_url": page_url,
+                "kind": kind,
+                "source": source,
+                "title": page_title,
+                "digest": digest,
+                "codec": codec,
+                "size": len(data),
+                "captured_at": datetime.now().isoformat(timespec="seconds"),
+            }, self.root)
+            self.count += 1
+        except OSError as e:
+            logging.error(f"Failed to archive {page_url}: {e}")
+
+    async def store_html(self, page_url, html, page_title=None, source="listing"):
+        """Archive a rendered listing page (source "listing") or a grid fragment ("sfcc")."""
+        await self._store("html", source, page_url, html.encode("utf-8"), page_title)
+
+    async def store_json(self, page_url, payload, page_title=None, source="woocommerce"):
+        """Archive a decoded JSON response, e.g. a WooCommerce Store API page."""
+        await self._store("json", source, page_url, json.dumps(payload).encode("utf-8"), page_title)
@@ -0,0 +1,232 @@
+import asyncio
+import logging
+from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse, urljoin
+from site_config import get_site_config
+
+
+def set_query_params(url, params):
+    """Return url with params merged into its query string."""
+    parts = urlparse(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update({key: str(value) for key, value in params.items()})
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+class PaginationStrategy:
+    """
+    Base class for the pagination strategies configured in websites.json.
+
+    URL-based strategies (url_based = True) give every page its own URL, so pages can
+    be fetched independently. In-page strategies advance an already loaded page with
+    load_more() or follow links with next_url().
+    """
+
+    name = None
+    url_based = True
+
+    def __init__(self, start_page=1, **options):
+        self.start_page = int(start_page)
+        self.options = options
+
+    def first_page(self, max_pages):
+        """Page number the scrape should start fetching from."""
+        return self.start_page
+
+    def page_url(self, url, page_number):
+        """URL of the given page number."""
+        return url
+
+    def page_urls(self, url, max_pages):
+        """List of (page_number, url) pairs that cover max_pages pages."""
+        if not self.url_based:
+            return [(self.start_page, url)]
+        last_page = self.start_page + max_pages - 1
+        return [(n, self.page_url(url, n)) for n in range(self.first_page(max_pages), last_page + 1)]
+
+    async def next_url(self, page, current_url):
+        """URL of the page after current_url, or None when there is no next page."""
+        return None
+
+    async def load_more(self, page):
+        """Load the next batch of tiles into the current page. Returns True if more loaded."""
+        return False
+
+    async def load_pages(self, page, max_pages):
+        """Advance an already loaded page up to max_pages pages in place. Returns pages loaded."""
+        loaded = 1
+        while loaded < max_pages and await self.load_more(page):
+            loaded += 1
+        return loaded
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(start_page={self.start_page}, {self.options})"
+
+
+class PageNumberPagination(PaginationStrategy):
+    """`?page=N` style pagination, or `/page/N/` when a path template is configured."""
+
+    name = "page_number"
+
+    def page_url(self, url, page_number):
+        if page_number == self.start_page and not self.options.get("include_first", False):
+            return url
+
+        value = page_number + int(self.options.get("offset", 0))
+        path = self.options.get("path")
+        if path:
+            parts = urlparse(url)
+            new_path = parts.path.rstrip("/") + path.format(page=value)
+            return urlunparse(parts._replace(path=new_path))
+
+        params = dict(self.options.get("extra_params", {}))
+        params[self.options.get("param", "page")] = value
+        return set_query_params(url, params)
+
+
+class OffsetPagination(PaginationStrategy):
+    """`?start=(N-1)*size&sz=size` style pagination (Salesforce Commerce Cloud)."""
+
+    name = "offset"
+
+    def page_url(self, url, page_number):
+        page_size = int(self.options.get("page_size", 20))
+        return set_query_params(url, {
+            self.options.get("start_param", "start"): (page_number - self.start_page) * page_size,
+            self.options.get("size_param", "sz"): page_size,
+        })
+
+
+class CumulativeLoadMorePagination(PageNumberPagination):
+    """
+    `?loadMore=N` style pagination where page N already contains pages 1..N.
+
+    Only the last page needs to be rendered, so the scrape starts there.
+    """
+
+    name = "cumulative_load_more"
+
+    def first_page(self, max_pages):
+        return self.start_page + max_pages - 1
+
+
+class ClickLoadMorePagination(PaginationStrategy):
+    """A "Load more" button that appends the next batch of tiles to the current page."""
+
+    name = "click_load_more"
+    url_based = False
+
+    async def load_more(self, page):
+        button_selector = self.options["button_selector"]
+        tile_selector = self.options["tile_selector"]
+        wait = float(self.options.get("wait", 2))
+
+        try:
+            before = await page.locator(tile_selector).count()
+            button = await page.query_selector(button_selector)
+            if not button or not await button.is_visible():
+                logging.info("No more 'Load More' button.")
+                return False
+            await button.scroll_into_view_if_needed()
+            await button.click()
+            await page.wait_for_function(
+                "([selector, count]) => document.querySelectorAll(selector).length > count",
+                arg=[tile_selector, before],
+                timeout=wait * 5000,
+            )
+            return True
+        except Exception as e:
+            logging.warning(f"Load more click failed: {e}")
+            return False
+
+
+class InfiniteScrollPagination(PaginationStrategy):
+    """Tiles are appended as the page is scrolled to the bottom."""
+
+    name = "infinite_scroll"
+    url_based = False
+
+    async def load_more(self, page):
+        tile_selector = self.options["tile_selector"]
+        wait = float(self.options.get("wait", 2))
+        loader_selector = self.options.get("loader_selector")
+
+        before = await page.locator(tile_selector).count()
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        await asyncio.sleep(wait)
+        if loader_selector:
+            try:
+                await page.wait_for_selector(loader_selector, state="hidden", timeout=10000)
+            except Exception:
+                logging.info("Loader not found or hidden timeout.")
+        after = await page.locator(tile_selector).count()
+        return after > before
+
+
+class CursorPagination(PaginationStrategy):
+    """Follow the href of a "next page" link until it disappears."""
+
+    name = "cursor"
+    url_based = False
+
+    async def next_url(self, page, current_url):
+        next_selector = self.options["next_selector"]
+        try:
+            link = page.locator(next_selector)
+            if await link.count() == 0:
+                return None
+            href = await link.first.get_attribute(self.options.get("attribute", "href"))
+            return urljoin(current_url, href) if href else None
+        except Exception as e:
+            logging.warning(f"Error getting next page URL: {e}")
+            return None
+
+
+STRATEGIES = {
+    strategy.name: strategy
+    for strategy in (
+        PageNumberPagination,
+        OffsetPagination,
+        CumulativeLoadMorePagination,
+        ClickLoadMorePagination,
+        InfiniteScrollPagination,
+        CursorPagination,
+    )
+}
+
+
+def parse_pagination_pattern(pattern):
+    """Translate a legacy `pagination_pattern` such as "?loadMore=" into a pagination block."""
+    params = parse_qsl(pattern.lstrip("?&"), keep_blank_values=True)
+    if not params:
+        return {"strategy": "page_number"}
+
+    param = params[-1][0]
+    block = {
+        "strategy": "cumulative_load_more" if param == "loadMore" else "page_number",
+        "param": param,
+    }
+    extra_params = dict(params[:-1])
+    if extra_params:
+        block["extra_params"] = extra_params
+    return block
+
+
+def build_pagination(config, start_page=1):
+    """Create a strategy from a websites.json `pagination` block."""
+    options = dict(config)
+    strategy = options.pop("strategy", "page_number")
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown pagination strategy: {strategy}")
+    options.setdefault("start_page", start_page)
+    return STRATEGIES[strategy](**options)
+
+
+def get_pagination(url, default=None):
+    """Return the pagination strategy configured for url's site in websites.json."""
+    site = get_site_config(url)
+    config = site.get("pagination")
+    if config is None and site.get("pagination_pattern"):
+        config = parse_pagination_pattern(site["pagination_pattern"])
+    if config is None:
+        config = default or {"strategy": "page_number"}
+    return build_pagination(config, start_page=site.get("start_page", 1))
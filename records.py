@@ -0,0 +1,106 @@
+SHEET_HEADERS = ["Current Date", "Header", "Product Name", "Image", "Kt", "Price", "Total Dia wt", "Time", "ImagePath"]
+
+# Columns of the CSV / NDJSON / Parquet exports (see exporters.py)
+EXPORT_FIELDS = ["unique_id", "scrape_id", "current_date", "time", "header", "product_name", "kt",
+                 "price", "total_dia_wt", "image_url", "image_path", "image_status"]
+
+# ImageStatus values. Rows are stored before their image is fetched; the backfill
+# worker moves them from PENDING to READY or FAILED and fills in ImagePath.
+IMAGE_PENDING = "pending"
+IMAGE_READY = "ready"
+IMAGE_FAILED = "failed"
+IMAGE_NONE = "none"
+
+
+class ProductRecord:
+    """
+    One scraped product. The database row and the workbook row are views over
+    the same object, so filling in the image path updates both.
+    """
+
+    __slots__ = (
+        "unique_id", "current_date", "page_title", "product_name", "image_path",
+        "kt", "price", "diamond_weight", "time_only", "image_url", "image_status", "scrape_id",
+    )
+
+    def __init__(self, unique_id, current_date, page_title, product_name, kt, price,
+                 diamond_weight, time_only, image_url, image_path=None, image_status=None, scrape_id=None):
+        self.unique_id = unique_id
+        self.current_date = current_date
+        self.page_title = page_title
+        self.product_name = product_name
+        self.image_path = image_path
+        self.kt = kt
+        self.price = price
+        self.diamond_weight = diamond_weight
+        self.time_only = time_only
+        self.image_url = image_url
+        self.image_status = image_status or (IMAGE_PENDING if image_url not in (None, "N/A") else IMAGE_NONE)
+        self.scrape_id = scrape_id
+
+    @classmethod
+    def from_db(cls, row):
+        """Build a record from an IBM_Algo_Webstudy_Products row fetched with as_dict=True."""
+        current_date, time = row["CurrentDate"], row.get("Time")
+        return cls(
+            row["unique_id"],
+            current_date.strftime("%Y-%m-%d") if hasattr(current_date, "strftime") else current_date,
+            row["Header"], row["ProductName"], row["Kt"], row["Price"], row["TotalDiaWt"],
+            time.strftime("%H.%M") if hasattr(time, "strftime") else time,
+            row.get("ImageUrl") or "N/A", row.get("ImagePath"), row.get("ImageStatus"), row.get("ScrapeId"),
+        )
+
+    def db_row(self):
+        """Row for database.insert_into_db (IBM_Algo_Webstudy_Products column order)."""
+        return (self.unique_id, self.current_date, self.page_title, self.product_name,
+                self.image_path, self.kt, self.price, self.diamond_weight,
+                self.image_url, self.image_status, self.scrape_id)
+
+    def sheet_row(self):
+        """Row for the workbook; the Image column is filled by an embedded picture."""
+        return [self.current_date, self.page_title, self.product_name, None, self.kt,
+                self.price, self.diamond_weight, self.time_only, self.image_url]
+
+    def export_row(self):
+        """Row for the table exports, keyed by EXPORT_FIELDS."""
+        return {
+            "unique_id": self.unique_id, "scrape_id": self.scrape_id, "current_date": self.current_date,
+            "time": self.time_only, "header": self.page_title, "product_name": self.product_name,
+            "kt": self.kt, "price": self.price, "total_dia_wt": self.diamond_weight,
+            "image_url": self.image_url, "image_path": self.image_path, "image_status": self.image_status,
+        }
+
+    def __repr__(self):
+        return f"ProductRecord({self.unique_id!r}, {self.product_name!r})"
+
+
+class RecordSet:
+    """Ordered collection of ProductRecords with O(1) lookup by unique_id."""
+
+    def __init__(self):
+        self._records = []
+        self._index = {}
+
+    def add(self, record):
+        self._index[record.unique_id] = len(self._records)
+        self._records.append(record)
+        return record
+
+    def get(self, unique_id):
+        index = self._index.get(unique_id)
+        return None if index is None else self._records[index]
+
+    def set_image_path(self, unique_id, image_path, image_status=None):
+        record = self._records[self._index[unique_id]]
+        record.image_path = image_path
+        if image_status:
+            record.image_status = image_status
+
+    def db_rows(self):
+        return [record.db_row() for record in self._records]
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records)
@@ -0,0 +1,200 @@
+import os
+import time
+import logging
+import threading
+from collections import namedtuple
+from image_store import get_image_store
+from database import get_recent_image_paths
+
+# Generated files are pruned by a background worker, one rule per tick, so no pass
+# walks everything at once. Each rule evicts least-recently-used files older than
+# its age limit, then more until the rule is under its byte budget. Never evicted:
+#  - files touched within RETENTION_MIN_AGE seconds (scrapes still writing them),
+#  - run images referenced by DB rows of the last RETENTION_PROTECT_DAYS days,
+#  - store objects still hard-linked from a run folder, and thumbnails of live objects.
+# Evicting a store object only drops it from the HTTP cache; urls.jsonl lookups check
+# that the object still exists, so the next scrape simply downloads it again.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXCEL_DATA_PATH = os.path.join(BASE_DIR, "static", "ExcelData")
+IMAGE_SAVE_PATH = os.path.join(BASE_DIR, "static", "Images")
+
+RETENTION = os.getenv("RETENTION", "1").lower() in ("1", "true", "yes")
+RETENTION_INTERVAL = int(os.getenv("RETENTION_INTERVAL", 600))
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", 2000))
+RETENTION_MIN_AGE = int(os.getenv("RETENTION_MIN_AGE", 3600))
+RETENTION_PROTECT_DAYS = int(os.getenv("RETENTION_PROTECT_DAYS", 30))
+GB = 1024 ** 3
+
+Rule = namedtuple("Rule", ["name", "scan", "max_age_days", "max_bytes"])
+Artifact = namedtuple("Artifact", ["path", "size", "last_used", "pinned"])
+
+
+def _env_limit(name, default, scale=1):
+    """Numeric limit from the environment; an empty value disables it."""
+    value = os.getenv(name, default)
+    return float(value) * scale if value not in (None, "") else None
+
+
+def last_used(stat):
+    # atime is the best LRU signal but is not updated on relatime/noatime mounts
+    return max(stat.st_atime, stat.st_mtime)
+
+
+def walk_files(root):
+    """os.stat_result of every file under root, without following symlinks."""
+    stack = [root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except FileNotFoundError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                try:
+                    yield entry.path, entry.stat(follow_symlinks=False)
+                except FileNotFoundError:
+                    continue
+
+
+def scan_workbooks(now):
+    for path, stat in walk_files(EXCEL_DATA_PATH):
+        used = last_used(stat)
+        yield Artifact(path, stat.st_size, used, now - used < RETENTION_MIN_AGE)
+
+
+def scan_run_images(now):
+    referenced = get_recent_image_paths(RETENTION_PROTECT_DAYS)
+    if referenced is None:
+        logging.warning("Retention: skipping run images, referenced paths are unknown")
+        return
+    referenced = {os.path.normcase(os.path.abspath(path)) for path in referenced}
+    for path, stat in walk_files(IMAGE_SAVE_PATH):
+        used = last_used(stat)
+        pinned = now - used < RETENTION_MIN_AGE or os.path.normcase(path) in referenced
+        # A hard link frees nothing while the store keeps the other name
+        yield Artifact(path, stat.st_size if stat.st_nlink == 1 else 0, used, pinned)
+
+
+def scan_store_objects(now):
+    for path, stat in walk_files(os.path.join(get_image_store().root, "objects")):
+        used = last_used(stat)
+        yield Artifact(path, stat.st_size, used, stat.st_nlink > 1 or now - used < RETENTION_MIN_AGE)
+
+
+def scan_thumbnails(now):
+    image_store = get_image_store()
+    for path, stat in walk_files(os.path.join(image_store.root, "thumbs")):
+        digest = os.path.basename(path).split("_", 1)[0]
+        used = last_used(stat)
+        alive = os.path.exists(image_store.object_path(digest))
+        yield Artifact(path, stat.st_size, used, alive or now - used < RETENTION_MIN_AGE)
+
+
+RULES = [
+    Rule("workbooks", scan_workbooks,
+         _env_limit("RETENTION_WORKBOOK_DAYS", 30), _env_limit("RETENTION_WORKBOOK_GB", 5, GB)),
+    Rule("run_images", scan_run_images,
+         _env_limit("RETENTION_IMAGE_DAYS", 30), _env_limit("RETENTION_IMAGE_GB", 10, GB)),
+    Rule("image_store", scan_store_objects,
+         _env_limit("RETENTION_STORE_DAYS", 90), _env_limit("RETENTION_STORE_GB", 20, GB)),
+    # Thumbnails of evicted objects are orphans: every unpinned one is expired
+    Rule("thumbnails", scan_thumbnails, 0, None),
+]
+
+
+def select_evictions(artifacts, rule, now, limit=None):
+    """Least recently used unpinned artifacts that are too old or push the rule over budget."""
+    artifacts = sorted(artifacts, key=lambda artifact: artifact.last_used)
+    total = sum(artifact.size for artifact in artifacts)
+    evictions = []
+    for artifact in artifacts:
+        if limit is not None and len(evictions) >= limit:
+            break
+        expired = rule.max_age_days is not None and now - artifact.last_used > rule.max_age_days * 86400
+        over_budget = rule.max_bytes is not None and total > rule.max_bytes
+        if not expired and not over_budget:
+            # Everything after this is newer and the total only shrinks
+            break
+        if artifact.pinned:
+            continue
+        evictions.append(artifact)
+        total -= artifact.size
+    return evictions, total
+
+
+def remove_empty_dirs(root):
+    """Remove empty subdirectories of root (but not root), deepest first."""
+    for dirpath, dirnames, filenames in os.walk(root, topdown=False):
+        if dirpath != root and not dirnames and not filenames:
+            try:
+                os.rmdir(dirpath)
+            except OSError:
+                pass
+
+
+def apply_rule(rule, limit=RETENTION_BATCH, dry_run=False):
+    """Evict up to `limit` artifacts of one rule; returns (evicted files, bytes freed)."""
+    now = time.time()
+    evictions, remaining = select_evictions(rule.scan(now), rule, now, limit)
+    freed = 0
+    for artifact in evictions:
+        if dry_run:
+            logging.info(f"Retention ({rule.name}): would remove {artifact.path}")
+        else:
+            try:
+                os.remove(artifact.path)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logging.error(f"Retention ({rule.name}): could not remove {artifact.path}: {e}")
+                continue
+        freed += artifact.size
+    if rule.name == "run_images" and evictions and not dry_run:
+        remove_empty_dirs(IMAGE_SAVE_PATH)
+    if rule.name == "image_store" and evictions and not dry_run:
+        # Also drops the URLs of evicted objects from the index
+        get_image_store().compact()
+    if evictions:
+        logging.info(
+            f"Retention ({rule.name}): {'would remove' if dry_run else 'removed'} {len(evictions)} files, "
+            f"{freed / 1024 ** 2:.1f} MB; {remaining / 1024 ** 2:.1f} MB kept"
+        )
+    return len(evictions), freed
+
+
+def run_retention(dry_run=False, limit=None):
+    """One pass over every rule, e.g. from the CLI."""
+    return {rule.name: apply_rule(rule, limit, dry_run) for rule in RULES}
+
+
+class RetentionWorker(threading.Thread):
+    """Applies one rule per tick, RETENTION_INTERVAL seconds apart, in the background."""
+
+    def __init__(self, interval=RETENTION_INTERVAL):
+        super().__init__(name="retention", daemon=True)
+        self.interval = interval
+
+    def run(self):
+        tick = 0
+        while True:
+            time.sleep(self.interval)
+            rule = RULES[tick % len(RULES)]
+            tick += 1
+            try:
+                apply_rule(rule)
+            except Exception as e:
+                logging.error(f"Retention ({rule.name}) failed: {e}")
+
+
+_worker = None
+
+
+def start_retention():
+    """Start the background retention worker once per process, unless RETENTION=0."""
+    global _worker
+    if RETENTION and _worker is None:
+        _worker = RetentionWorker()
+        _worker.start()
+    return _worker
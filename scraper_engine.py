@@ -0,0 +1,521 @@
+import os
+import uuid
+import random
+import asyncio
+import logging
+from datetime import datetime
+from dotenv import load_dotenv
+from playwright.async_api import async_playwright, TimeoutError, Error
+from utils import get_public_ip, log_event
+from site_config import clean_price, get_site_config
+from pagination import get_pagination
+from image_resolver import IMAGE_TARGET_WIDTH, resolve_image
+from extraction import extract_tiles
+from structured_data import extract_products, parse_snapshot_products
+from attributes import parse_attributes_batch
+from records import IMAGE_NONE, IMAGE_PENDING, ProductRecord, RecordSet
+from snapshot_parser import OFFLINE_PARSING, capture_snapshot, parse_snapshot
+from sfcc import SFCC_PAGE_SIZE, fetch_sfcc_products
+from woocommerce import fetch_woocommerce_products, map_product
+from selector_health import BLOCKED, EMPTY, PageBlockedError, SelectorDriftError, probe_listing
+from browser_images import ImageCapture, capture_enabled, captured_candidate
+from image_backfill import ImageJob, get_backfill
+from workbooks import render_workbook
+from exporters import export_records, open_exporter
+from page_archive import PageArchive, load_entry, scrape_entries
+from database import insert_into_db, replace_scrape_products
+from limit_checker import update_product_count
+
+load_dotenv()
+PROXY_URL = os.getenv("PROXY_URL")
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+EXCEL_DATA_PATH = os.path.join(BASE_DIR, 'static', 'ExcelData')
+IMAGE_SAVE_PATH = os.path.join(BASE_DIR, 'static', 'Images')
+
+# By default a scrape only stores rows; its workbook is rendered when first
+# requested (GET /workbook?scrape_id=..., see workbook_cache). INLINE_WORKBOOKS=1
+# writes it under static/ExcelData at the end of every scrape as before.
+INLINE_WORKBOOKS = os.getenv("INLINE_WORKBOOKS", "0").lower() in ("1", "true", "yes")
+
+# Per-site behaviour lives in websites.json. The `selectors` block holds:
+#   wait_selector    element that signals the listing has rendered
+#   tile_selector    one product tile
+#   product_title / product_price / product_image / product_details
+#                    field rules relative to the tile (see extraction.normalize_fields)
+# and the site entry may add `attribute_fields`, `image_rewrites` and
+# `image_target_width` (see image_resolver), `capture_images` (see browser_images),
+# `price_strip` (tokens removed from every price, e.g. ["$", ","]),
+# `consent_selector`, `scroll_rounds`, `structured_data` (false skips the
+# JSON-LD/microdata fast path),
+# `adapter` ("sfcc" or "woocommerce") and `output_prefix`.
+FIELD_NAMES = {
+    "product_title": "product_name",
+    "product_price": "price",
+    "product_image": "image_url",
+    "product_details": "details",
+}
+
+def site_fields(selectors):
+    """Build the extract_tiles field map from a websites.json `selectors` block."""
+    return {name: selectors[key] for key, name in FIELD_NAMES.items() if selectors.get(key)}
+
+
+def attribute_text(product, fields):
+    """Join the tile fields a site's kt/carat attributes are read from."""
+    return " ".join(product[field] for field in fields if product.get(field, "N/A") != "N/A")
+
+
+async def safe_goto_and_wait(page, url, selectors, retries=3, structured=True):
+    """
+    Navigate to a listing and probe it (see selector_health).
+
+    Returns "ok" or "empty". Navigation errors and bot walls are retried; markup
+    drift raises SelectorDriftError straight away, unless structured is set and the
+    page carries structured Product data that read_listing can use instead.
+    """
+    for attempt in range(retries):
+        try:
+            logging.info(f"[Attempt {attempt + 1}] Navigating to: {url}")
+            response = await page.goto(url, timeout=180_000, wait_until="domcontentloaded")
+        except (Error, TimeoutError) as e:
+            logging.warning(f"Error navigating to {url} on attempt {attempt + 1}: {e}")
+            if attempt < retries - 1:
+                await asyncio.sleep(random.uniform(1, 3))
+                continue
+            logging.error(f"Failed to navigate to {url} after {retries} attempts.")
+            raise
+
+        outcome = await probe_listing(page, url, selectors, response.status if response else None, structured)
+        if outcome != BLOCKED:
+            logging.info(f"[Success] Listing probe: {outcome}.")
+            return outcome
+        if attempt < retries - 1:
+            await asyncio.sleep(random.uniform(3, 8))
+    raise PageBlockedError(f"{url} is still blocked after {retries} attempts")
+
+
+async def accept_consent(page, consent_selector):
+    """Dismiss a cookie banner if the site configures one."""
+    if not consent_selector:
+        return
+    try:
+        button = page.locator(consent_selector).first
+        await button.wait_for(state="visible", timeout=5000)
+        await button.click()
+        logging.info("Accepted cookie consent.")
+        await asyncio.sleep(1)
+    except Exception:
+        logging.info("No cookie popup found.")
+
+
+async def scroll_until_stable(page, tile_selector, rounds=10):
+    """Scroll to the bottom until the tile count stops growing, to trigger lazy loading."""
+    previous_count = 0
+    for _ in range(rounds):
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        await asyncio.sleep(random.uniform(1, 2))
+        current_count = await page.locator(tile_selector).count()
+        if current_count == previous_count:
+            break
+        previous_count = current_count
+
+
+async def read_listing(page, site, page_url):
+    """Extract the tiles of a live page, from structured data first unless the site opts out."""
+    selectors = site["selectors"]
+    if site.get("structured_data", True):
+        return await extract_products(page, selectors["tile_selector"], site_fields(selectors), page_url)
+    return await extract_tiles(page, selectors["tile_selector"], site_fields(selectors))
+
+
+async def parse_listing_snapshot(html, site, page_url):
+    """Snapshot counterpart of read_listing."""
+    selectors = site["selectors"]
+    if site.get("structured_data", True):
+        return await parse_snapshot_products(html, selectors["tile_selector"], site_fields(selectors), page_url)
+    return await parse_snapshot(html, selectors["tile_selector"], site_fields(selectors), base_url=page_url)
+
+
+async def open_page(p):
+    browser = await p.chromium.connect_over_cdp(PROXY_URL)
+    context = await browser.new_context()
+    page = await context.new_page()
+    page.set_default_timeout(120000)
+    return browser, page
+
+
+async def render_listing(p, site, current_url, next_page=None, archive=None):
+    """
+    Load one listing URL in a fresh remote browser and return (products, page_title, next_url).
+
+    next_page, when given, is awaited with the live page before it is released so
+    cursor pagination can read the "next" link. The rendered HTML is stored in archive.
+    """
+    selectors = site["selectors"]
+    browser, page = await open_page(p)
+    capture = ImageCapture(page) if capture_enabled(site) else None
+    next_url = None
+    try:
+        if await safe_goto_and_wait(page, current_url, selectors, structured=site.get("structured_data", True)) == EMPTY:
+            return [], await page.title(), None
+        await accept_consent(page, site.get("consent_selector"))
+        await scroll_until_stable(page, selectors["tile_selector"], site.get("scroll_rounds", 10))
+        if next_page:
+            next_url = await next_page(page, current_url)
+
+        if OFFLINE_PARSING:
+            # Capture the rendered grid once and release the remote browser before parsing
+            html, page_title = await capture_snapshot(page)
+            if capture:
+                await capture.drain()
+            await browser.close()
+            browser = None
+            products = await parse_listing_snapshot(html, site, current_url)
+        else:
+            products = await read_listing(page, site, current_url)
+            page_title = await page.title()
+            html = await page.content() if archive and archive.enabled else None
+            if capture:
+                await capture.drain()
+        if html is not None and archive:
+            await archive.store_html(current_url, html, page_title)
+        if capture:
+            await capture.store(products, current_url)
+        return products, page_title, next_url
+    finally:
+        if browser:
+            await browser.close()
+
+
+async def collect_url_pages(site, url, max_pages, pagination, emit, archive=None):
+    """Pages with their own URLs: one fresh browser per page."""
+    async with async_playwright() as p:
+        for index, (page_count, current_url) in enumerate(pagination.page_urls(url, max_pages)):
+            logging.info(f"Processing page {page_count}: {current_url}")
+            try:
+                products, page_title, _ = await render_listing(p, site, current_url, archive=archive)
+                if not products:
+                    logging.info(f"Page {page_count} is empty, stopping pagination.")
+                    break
+                await emit(products, page_title, current_url)
+            except SelectorDriftError as e:
+                if index == 0:
+                    raise
+                # Later pages that lose the grid are usually past the end of the listing
+                logging.warning(f"Stopping at page {page_count}: {e}")
+                break
+            except Exception as e:
+                logging.error(f"Error processing page {page_count}: {e}")
+            await asyncio.sleep(random.uniform(2, 5))
+
+
+async def collect_cursor_pages(site, url, max_pages, pagination, emit, archive=None):
+    """Follow the site's "next" link page by page."""
+    current_url = url
+    page_count = 0
+    async with async_playwright() as p:
+        while current_url and page_count < max_pages:
+            page_count += 1
+            logging.info(f"Processing page {page_count}: {current_url}")
+            try:
+                products, page_title, next_url = await render_listing(p, site, current_url, pagination.next_url, archive)
+                await emit(products, page_title, current_url)
+            except SelectorDriftError as e:
+                if page_count == 1:
+                    raise
+                # Later pages that lose the grid are usually past the end of the listing
+                logging.warning(f"Stopping at page {page_count}: {e}")
+                break
+            except Exception as e:
+                logging.error(f"Error processing page {page_count}: {e}")
+                break
+            current_url = next_url
+            await asyncio.sleep(random.uniform(2, 5))
+
+
+async def collect_in_page(site, url, max_pages, pagination, emit, archive=None):
+    """Load-more buttons and infinite scroll: grow one page, then extract every tile once."""
+    selectors = site["selectors"]
+    async with async_playwright() as p:
+        browser, page = await open_page(p)
+        capture = ImageCapture(page) if capture_enabled(site) else None
+        try:
+            await safe_goto_and_wait(page, url, selectors, structured=site.get("structured_data", True))
+            await accept_consent(page, site.get("consent_selector"))
+            pages_loaded = await pagination.load_pages(page, max_pages)
+            logging.info(f"Loaded {pages_loaded} page(s) in place for {url}")
+            if OFFLINE_PARSING:
+                # Capture the grown grid once and release the remote browser before parsing
+                html, page_title = await capture_snapshot(page)
+                if capture:
+                    await capture.drain()
+                await browser.close()
+                browser = None
+                products = await parse_listing_snapshot(html, site, url)
+            else:
+                products = await read_listing(page, site, url)
+                page_title = await page.title()
+                html = await page.content() if archive and archive.enabled else None
+                if capture:
+                    await capture.drain()
+            if html is not None and archive:
+                await archive.store_html(url, html, page_title)
+            if capture:
+                await capture.store(products, url)
+            await emit(products, page_title, url)
+        except SelectorDriftError:
+            raise
+        except Exception as e:
+            logging.error(f"Error scraping {url}: {e}")
+        finally:
+            if browser:
+                await browser.close()
+
+
+async def collect_sfcc(site, url, max_pages, pagination, emit, archive=None):
+    """Salesforce Commerce Cloud: one render, then large Search-UpdateGrid windows."""
+    selectors = site["selectors"]
+    image = selectors["product_image"]
+    grid_selectors = {
+        "tile": selectors["tile_selector"],
+        "name": selectors["product_title"],
+        "price": selectors["product_price"],
+        "image": image["selector"] if isinstance(image, dict) else image,
+    }
+    async with async_playwright() as p:
+        browser, page = await open_page(p)
+        capture = ImageCapture(page) if capture_enabled(site) else None
+        try:
+            # Later windows are read with the tile selectors, so structured data cannot stand in
+            await safe_goto_and_wait(page, url, selectors, structured=False)
+            await accept_consent(page, site.get("consent_selector"))
+            page_size = int(site.get("pagination", {}).get("page_size", SFCC_PAGE_SIZE))
+            page_title = await page.title()
+
+            async def archive_fragment(window_url, html):
+                if archive:
+                    await archive.store_html(window_url, html, page_title, source="sfcc")
+
+            products = await fetch_sfcc_products(page, url, max_pages * page_size, grid_selectors, on_fragment=archive_fragment)
+            if capture:
+                # Only the rendered first window has loaded images; later windows are fetched as HTML
+                await capture.drain()
+                await capture.store(products, url)
+            await emit(products, page_title, url)
+        except SelectorDriftError:
+            raise
+        except Exception as e:
+            logging.error(f"Error scraping {url}: {e}")
+        finally:
+            await browser.close()
+
+
+def collector_for(site, pagination):
+    if site.get("adapter") == "sfcc":
+        return collect_sfcc
+    if pagination.name == "cursor":
+        return collect_cursor_pages
+    if not pagination.url_based:
+        return collect_in_page
+    return collect_url_pages
+
+
+class ListingWriter:
+    """
+    Turns extracted products into ProductRecords. Shared by scrape_site and reparse_scrape.
+
+    Each emitted page is stored in the database straight away with its images
+    pending; the image backfill fetches them in the background. With inline_workbook
+    the workbook is rendered from the records (again, with pictures, once the
+    backfill is done); otherwise it is left to workbook_cache. With another
+    export_format (csv, ndjson, parquet) each page is appended to the export file
+    instead and no workbook is written; the file is rewritten with the final
+    ImagePath/ImageStatus once the backfill is done.
+    """
+
+    def __init__(self, site, scrape_id, download_images=True, export_format="xlsx", inline_workbook=None,
+                 defer_rows=False):
+        self.site = site
+        self.scrape_id = scrape_id
+        self.download_images = download_images
+        self.inline_workbook = INLINE_WORKBOOKS if inline_workbook is None else inline_workbook
+        self.capture_images = capture_enabled(site)
+        self.backfill = get_backfill()
+        self.attribute_fields = site.get("attribute_fields", ["product_name"])
+        self.rewrites = site.get("image_rewrites", [])
+        self.target_width = int(site.get("image_target_width", IMAGE_TARGET_WIDTH))
+        self.price_strip = site.get("price_strip", [])
+        self.records = RecordSet()
+        self.seen = set()
+        # With defer_rows, rows and image jobs wait for store_deferred (used by reparse)
+        self.defer_rows = defer_rows
+        self.deferred_jobs = []
+        # Set when an insert fails; finish() then renders the workbook inline so the rows survive
+        self.db_failed = False
+
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.image_folder = os.path.join(IMAGE_SAVE_PATH, self.timestamp)
+        os.makedirs(self.image_folder, exist_ok=True)
+
+        prefix = site.get("output_prefix") or f"handle_{site.get('title', 'scrape')}"
+        self.filename = f"{prefix}_{datetime.now().strftime('%Y-%m-%d_%H.%M')}.{export_format}"
+        self.file_path = os.path.join(EXCEL_DATA_PATH, self.filename)
+        self.export_format = export_format
+        self.exporter = open_exporter(export_format, self.file_path) if export_format != "xlsx" else None
+
+    async def emit(self, products, page_title, page_url):
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        time_only = datetime.now().strftime("%H.%M")
+        new_products = []
+        texts = []
+
+        for product in products:
+            product_name = product.get("product_name", "N/A")
+            price = clean_price(product.get("price", "N/A"), self.price_strip)
+            thumbnail_url, image_url = resolve_image(product.get("image_url", "N/A"), page_url, self.rewrites, self.target_width)
+            if self.capture_images:
+                thumbnail_url = captured_candidate(product.get("image_url"), page_url, thumbnail_url)
+
+            key = (product_name, price, image_url)
+            if key not in self.seen:
+                self.seen.add(key)
+                new_products.append((product_name, price, image_url, thumbnail_url))
+                texts.append(attribute_text(product, self.attribute_fields))
+
+        page_records = []
+        jobs = []
+        for (product_name, price, image_url, thumbnail_url), attrs in zip(new_products, parse_attributes_batch(texts)):
+            record = self.records.add(ProductRecord(
+                str(uuid.uuid4()), current_date, page_title, product_name,
+                attrs.kt, price, attrs.diamond_weight, time_only, image_url, scrape_id=self.scrape_id,
+            ))
+            page_records.append(record)
+            if not self.download_images:
+                record.image_status = IMAGE_NONE
+            elif thumbnail_url != "N/A":
+                image_path = os.path.join(self.image_folder, f"{record.unique_id}_{self.timestamp}.jpg")
+                jobs.append(ImageJob(record.unique_id, thumbnail_url, image_url, image_path, product_name))
+
+        logging.info(f"Collected {len(new_products)} new products from {page_url}")
+        if self.exporter:
+            await asyncio.to_thread(self.exporter.write, page_records)
+        if self.defer_rows:
+            self.deferred_jobs.extend(jobs)
+            return
+        try:
+            await asyncio.to_thread(insert_into_db, [record.db_row() for record in page_records])
+        except Exception as e:
+            logging.error(f"Storing rows of {page_url} failed, the workbook will be written inline: {e}")
+            self.db_failed = True
+        if jobs:
+            self.backfill.submit(jobs, self.apply_images)
+
+    async def store_deferred(self):
+        """Replace the scrape's stored rows with every collected record, then queue their images."""
+        await asyncio.to_thread(replace_scrape_products, self.scrape_id, self.records.db_rows())
+        if self.deferred_jobs:
+            self.backfill.submit(self.deferred_jobs, self.apply_images)
+            self.deferred_jobs = []
+
+    async def apply_images(self, results):
+        """Backfill callback: copy downloaded image paths and statuses onto the records."""
+        for unique_id, (image_path, image_status) in results.items():
+            self.records.set_image_path(unique_id, image_path, image_status)
+
+    async def render(self, results=None):
+        return await render_workbook(self.records, self.file_path)
+
+    async def rewrite_export(self, results=None):
+        """Backfill callback: rewrite the streamed export now that image paths and statuses are final."""
+        return await asyncio.to_thread(export_records, self.records, self.export_format, self.file_path)
+
+    async def finish(self):
+        """
+        Close the export or render the workbook (pictures follow with the backfill) and
+        return (filename, file_path); file_path is None when the workbook is left to
+        be rendered on demand.
+        """
+        if self.exporter:
+            await asyncio.to_thread(self.exporter.close)
+            if any(record.image_status == IMAGE_PENDING for record in self.records):
+                # Queued after this scrape's image batches, like the inline workbook
+                self.backfill.submit([], self.rewrite_export)
+        elif not self.inline_workbook and not self.db_failed:
+            log_event(f"Stored {len(self.records)} rows of scrape {self.scrape_id}; workbook renders on demand")
+            return self.filename, None
+        else:
+            await self.render()
+            # Queued after this scrape's image batches, so it re-renders with the pictures
+            self.backfill.submit([], self.render)
+        log_event(f"Data saved to {self.file_path}")
+        return self.filename, self.file_path
+
+
+async def scrape_site(url, max_pages, site=None, scrape_id=None, export_format="xlsx"):
+    """
+    Scrape a listing with the rules configured for its site in websites.json.
+
+    Stores the rows in the database as pages are read, writes the workbook under
+    static/ExcelData (or a csv/ndjson/parquet export, per export_format) and returns
+    (filename, file_path), served by /download/<filename>. Images are fetched
+    afterwards by the image backfill.
+    Every fetched page is archived under scrape_id for reparse_scrape.
+    """
+    site = site or get_site_config(url)
+    if not site.get("selectors", {}).get("tile_selector"):
+        raise ValueError(f"No tile selectors configured for {url}")
+
+    max_pages = int(max_pages or site.get("max_pages", 1))
+    pagination = get_pagination(url)
+    archive = PageArchive(scrape_id, url)
+    ip_address = get_public_ip()
+    logging.info(f"Scraping started for: {url} from IP: {ip_address}, max_pages: {max_pages}, scrape_id: {archive.scrape_id}")
+
+    writer = ListingWriter(site, archive.scrape_id, export_format=export_format)
+    if site.get("adapter") == "woocommerce":
+        async def archive_response(request_url, items, page_title):
+            await archive.store_json(request_url, items, page_title)
+
+        store = await fetch_woocommerce_products(url, max_pages, on_response=archive_response)
+        if store:
+            page_title, products = store
+            await writer.emit(products, page_title, url)
+
+    if not writer.records:
+        collect = collector_for(site, pagination)
+        await collect(site, url, max_pages, pagination, writer.emit, archive)
+
+    result = await writer.finish()
+    update_product_count(len(writer.records))
+    return result
+
+
+async def reparse_scrape(scrape_id, download_images=True, export_format="xlsx", inline_workbook=None):
+    """
+    Re-run extraction over the archived pages of a scrape with the current websites.json
+    rules, without touching the proxy.
+
+    Every page is parsed before anything is stored; the scrape's database rows are
+    then replaced in one transaction, so a failed reparse keeps the old rows.
+    Writes a new workbook and returns (filename, file_path).
+    """
+    pages = scrape_entries(scrape_id)
+    if not pages:
+        raise ValueError(f"No archived pages for scrape {scrape_id}")
+
+    url = pages[0]["url"]
+    site = get_site_config(url)
+    logging.info(f"Reparsing {len(pages)} archived page(s) of {url} (scrape_id: {scrape_id})")
+
+    writer = ListingWriter(site, scrape_id, download_images, export_format, inline_workbook, defer_rows=True)
+    for entry in pages:
+        payload = await asyncio.to_thread(load_entry, entry)
+        if entry["kind"] == "json":
+            products = [map_product(item) for item in payload]
+        else:
+            products = await parse_listing_snapshot(payload, site, entry["page_url"])
+        await writer.emit(products, entry["title"] or "N/A", entry["page_url"])
+
+    await writer.store_deferred()
+    return await writer.finish()
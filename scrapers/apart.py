@@ -1,320 +1,5 @@
-import time
-import re
-import os
-import uuid
-import asyncio
-import base64
-import logging
-from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as ExcelImage
-from flask import Flask, jsonify
-from dotenv import load_dotenv
-from PIL import Image as PILImage
-from io import BytesIO
-from utils import get_public_ip, log_event, sanitize_filename
-from database import insert_into_db
-from limit_checker import update_product_count
-import concurrent.futures
-import urllib.parse
-import random
-import httpx
-from playwright.async_api import async_playwright, TimeoutError, Error
-from openpyxl.drawing.image import Image
-load_dotenv()
-PROXY_URL = os.getenv("PROXY_URL")
+from scraper_engine import scrape_site
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-EXCEL_DATA_PATH = os.path.join(BASE_DIR, 'static', 'ExcelData')
-IMAGE_SAVE_PATH = os.path.join(BASE_DIR, 'static', 'Images')
 
-
-async def download_and_resize_image(session, image_url):
-    try:
-        async with session.get(modify_image_url(image_url), timeout=10) as response:
-            if response.status != 200:
-                return None
-            content = await response.read()
-            image = PILImage.open(BytesIO(content))
-            image.thumbnail((200, 200))
-            img_byte_arr = BytesIO()
-            image.save(img_byte_arr, format='JPEG', optimize=True, quality=85)
-            return img_byte_arr.getvalue()
-    except Exception as e:
-        logging.warning(f"Error downloading/resizing image: {e}")
-        return None
-
-def modify_image_url(image_url):
-    """Convert Apart low-res image URL ending with '_m.jpg' to high-res '.jpg' while keeping query params."""
-    if not image_url or image_url == "N/A":
-        return image_url
-
-    query_params = ""
-    if "?" in image_url:
-        image_url, query_params = image_url.split("?", 1)
-        query_params = f"?{query_params}"
-
-    # Replace '_m.jpg' with '.jpg' (removes the '_m' suffix for high-res)
-    modified_url = re.sub(r'_m(?=\.jpg$)', '', image_url)
-
-    return modified_url + query_params
-
-
-async def download_image_async(image_url, product_name, timestamp, image_folder, unique_id, retries=3):
-    if not image_url or image_url == "N/A":
-        return "N/A"
-
-    image_filename = f"{unique_id}_{timestamp}.jpg"
-    image_full_path = os.path.join(image_folder, image_filename)
-    modified_url = modify_image_url(image_url)  # High-res version
-
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        for attempt in range(retries):
-            try:
-                # Try high-res version first
-                response = await client.get(modified_url)
-                response.raise_for_status()
-                with open(image_full_path, "wb") as f:
-                    f.write(response.content)
-                return image_full_path
-            except httpx.HTTPStatusError as e:
-                # If high-res doesn't exist, fallback to original
-                if e.response.status_code == 404 and modified_url != image_url:
-                    logging.warning(f"High-res not found for {product_name}, trying original URL.")
-                    try:
-                        response = await client.get(image_url)
-                        response.raise_for_status()
-                        with open(image_full_path, "wb") as f:
-                            f.write(response.content)
-                        return image_full_path
-                    except Exception as fallback_err:
-                        logging.error(f"Fallback failed for {product_name}: {fallback_err}")
-                        break
-                else:
-                    logging.warning(f"HTTP error on attempt {attempt+1} for {product_name}: {e}")
-            except httpx.RequestError as e:
-                logging.warning(f"Request error on attempt {attempt+1} for {product_name}: {e}")
-    
-    logging.error(f"Failed to download image for {product_name} after {retries} attempts.")
-    return "N/A"
-
-def random_delay(min_sec=1, max_sec=3):
-    """Introduce a random delay to mimic human-like behavior."""
-    time.sleep(random.uniform(min_sec, max_sec))
-
-async def scroll_and_wait(page):
-    """Scroll down to load lazy-loaded products."""
-    previous_height = await page.evaluate("document.body.scrollHeight")
-    await page.evaluate("window.scrollBy(0, document.body.scrollHeight);")
-    new_height = await page.evaluate("document.body.scrollHeight")
-    return new_height > previous_height  # Returns True if more content is loaded
-
-async def safe_goto_and_wait(page, url, retries=3):
-    for attempt in range(retries):
-        try:
-            print(f"[Attempt {attempt + 1}] Navigating to: {url}")
-            await page.goto(url, timeout=180_000, wait_until="domcontentloaded")
-
-
-            # Wait for the selector with a longer timeout
-            product_cards = await page.wait_for_selector(".list-group-horizontal", state="attached", timeout=30000)
-
-            # Optionally validate at least 1 is visible (Playwright already does this)
-            if product_cards:
-                print("[Success] Product cards loaded.")
-                return
-        except Error as e:
-            logging.error(f"Error navigating to {url} on attempt {attempt + 1}: {e}")
-            if attempt < retries - 1:
-                logging.info("Retrying after waiting a bit...")
-                random_delay(1, 3)  # Add a delay before retrying
-            else:
-                logging.error(f"Failed to navigate to {url} after {retries} attempts.")
-                raise
-        except TimeoutError as e:
-            logging.warning(f"TimeoutError on attempt {attempt + 1} navigating to {url}: {e}")
-            if attempt < retries - 1:
-                logging.info("Retrying after waiting a bit...")
-                random_delay(1, 3)  # Add a delay before retrying
-            else:
-                logging.error(f"Failed to navigate to {url} after {retries} attempts.")
-                raise
-
-            
-
-async def safe_wait_for_selector(page, selector, timeout=15000, retries=3):
-    """Retry waiting for a selector."""
-    for attempt in range(retries):
-        try:
-            return await page.wait_for_selector(selector, state="attached", timeout=timeout)
-        except TimeoutError:
-            logging.warning(f"TimeoutError on attempt {attempt + 1}/{retries} waiting for {selector}")
-            if attempt < retries - 1:
-                random_delay(1, 2)  # Add delay before retrying
-            else:
-                raise
-
-
-
-async def handle_apart(url, max_pages):
-    ip_address = get_public_ip()
-    logging.info(f"Scraping started for: {url} from IP: {ip_address}, max_pages: {max_pages}")
-
-    # Prepare directories and files
-    os.makedirs(EXCEL_DATA_PATH, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    image_folder = os.path.join(IMAGE_SAVE_PATH, timestamp)
-    os.makedirs(image_folder, exist_ok=True)
-
-    # Create workbook and setup
-    wb = Workbook()
-    sheet = wb.active
-    sheet.title = "Products"
-    headers = ["Current Date", "Header", "Product Name", "Image", "Kt", "Price", "Total Dia wt", "Time", "ImagePath"]
-    sheet.append(headers)
-
-    all_records = []
-    filename = f"handle_apart_{datetime.now().strftime('%Y-%m-%d_%H.%M')}.xlsx"
-    file_path = os.path.join(EXCEL_DATA_PATH, filename)
-
-    page_count = 2
-    success_count = 0
-    current_url=url
-    
-    while page_count <= max_pages:
-        current_url = f"{url}?page={page_count - 1}"
-        logging.info(f"Processing page {page_count}: {current_url}")
-        
-        browser = None
-        page = None
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.connect_over_cdp(PROXY_URL)
-                context = await browser.new_context()
-                page = await context.new_page()
-                page.set_default_timeout(120000)
-
-                await safe_goto_and_wait(page, current_url)
-                log_event(f"Successfully loaded: {current_url}")
-
-                # Scroll to load all items
-                prev_count = 0
-                for _ in range(10):
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await asyncio.sleep(random.uniform(1, 2))
-                    count = await page.locator('.list-group-horizontal').count()
-                    if count == prev_count:
-                        break
-                    prev_count = count
-
-                page_title = await page.title()
-                current_date = datetime.now().strftime("%Y-%m-%d")
-                time_only = datetime.now().strftime("%H.%M")
-                
-                wrapper = page.locator("#product-list")
-                products = await wrapper.locator("li.item").all() if await wrapper.count() > 0 else []
-                
-           
-                logging.info(f"Total products scraped on page: {len(products)}")
-                records = []
-                image_tasks = []
-
-                image_tasks = []
-                
-                for row_num, product in enumerate(products, start=len(sheet["A"]) + 1):
-                    try:
-                        product_name = await (await product.query_selector("div.product-name a.productListGTM")).inner_text()
-                    except:
-                        product_name = "N/A"
-
-                    try:
-                        price_element = product.locator("div.price-cnt span.value").first
-                        if await price_element.count() > 0:
-                            price = await price_element.text_content()
-                            price = price.strip()
-                        else:
-                            price = "N/A"
-                    except:
-                        price = "N/A"
-
-                    try:
-                        image_element = product.locator("img.group.list-group-image").first
-                        if await image_element.count() > 0:
-                            image_url = await image_element.get_attribute("src")
-                            if image_url and image_url.startswith("//"):
-                                image_url = f"https:{image_url}"
-                        else:
-                            image_url = "N/A"
-                    except:
-                        image_url = "N/A"
-
-                    gold_type_match = re.search(r"(\d{1,2}K|Platinum|Silver|Gold|White Gold|Yellow Gold|Rose Gold)", product_name, re.IGNORECASE)
-                    kt = gold_type_match.group(0) if gold_type_match else "N/A"
-
-                    diamond_weight_match = re.search(r"(\d+(\.\d+)?)\s*(ct|carat)", product_name, re.IGNORECASE)
-                    diamond_weight = f"{diamond_weight_match.group(1)} ct" if diamond_weight_match else "N/A"
-
-                    unique_id = str(uuid.uuid4())
-                    image_tasks.append((row_num, unique_id, asyncio.create_task(
-                        download_image_async(image_url, product_name, timestamp, image_folder, unique_id)
-                    )))
-                    
-
-                    # all_records.append((unique_id, current_date, page_title, product_name, image_url, kt, price, diamond_weight))
-                    records.append((unique_id, current_date, page_title, product_name, None, kt, price, diamond_weight))
-                    sheet.append([current_date, page_title, product_name, None, kt, price, diamond_weight, time_only, image_url])
-
-                    
-                for row_num, unique_id, task in image_tasks:
-                    try:
-                        image_path = await asyncio.wait_for(task, timeout=60)
-                        if image_path != "N/A":
-                            try:
-                                img = ExcelImage(image_path)
-                                img.width, img.height = 100, 100
-                                sheet.add_image(img, f"D{row_num}")
-                            except Exception as e:
-                                logging.error(f"Error embedding image: {e}")
-                                image_path = "N/A"
-                        for i, record in enumerate(records):
-                            if record[0] == unique_id:
-                                records[i] = (record[0], record[1], record[2], record[3], image_path, record[5], record[6], record[7])
-                                break
-                    except asyncio.TimeoutError:
-                        logging.warning(f"Image download timed out for row {row_num}")
-
-                all_records.extend(records)
-                success_count += 1
-
-                 #Save progress after each page
-                wb.save(file_path)
-                logging.info(f"Progress saved after page {page_count}")
-
-        except Exception as e:
-            logging.error(f"Error processing page {page_count}: {str(e)}")
-            # Save what we have so far
-            wb.save(file_path)
-        finally:
-            # Clean up resources for this page
-            if page:
-                await page.close()
-            if browser:
-                await browser.close()
-            
-            # Add delay between pages
-            await asyncio.sleep(random.uniform(2, 5))
-            
-        page_count += 1
-
-
-    # Final save and database operations
-    wb.save(file_path)
-    log_event(f"Data saved to {file_path}")
-
-    with open(file_path, "rb") as file:
-        base64_encoded = base64.b64encode(file.read()).decode("utf-8")
-
-    insert_into_db(all_records)
-    update_product_count(len(all_records))
-
-    return base64_encoded, filename, file_path
\ No newline at end of file
+async def handle_apart(url, max_pages, scrape_id=None, export_format="xlsx"):
+    return await scrape_site(url, max_pages, scrape_id=scrape_id, export_format=export_format)
@@ -1,221 +1,5 @@
-import asyncio
-import re
-import os
-import uuid
-import logging
-import base64
-from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image
-from flask import Flask
-from dotenv import load_dotenv
-from utils import get_public_ip, log_event, sanitize_filename
-from database import insert_into_db
-from limit_checker import update_product_count
-import httpx
-from playwright.async_api import async_playwright, TimeoutError
+from scraper_engine import scrape_site
 
-# Load .env variables
-load_dotenv()
-PROXY_URL = os.getenv("PROXY_URL")
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-EXCEL_DATA_PATH = os.path.join(BASE_DIR, 'static', 'ExcelData')
-IMAGE_SAVE_PATH = os.path.join(BASE_DIR, 'static', 'Images')
-
-
-async def download_image(session, image_url, product_name, timestamp, image_folder, unique_id):
-    if not image_url or image_url == "N/A":
-        return "N/A"
-    image_filename = f"{unique_id}_{timestamp}.jpg"
-    image_full_path = os.path.join(image_folder, image_filename)
-
-    for attempt in range(3):
-        try:
-            resp = await session.get(image_url, timeout=10)
-            resp.raise_for_status()
-            with open(image_full_path, "wb") as f:
-                f.write(resp.content)
-            return image_full_path
-        except Exception as e:
-            logging.warning(f"Retry {attempt + 1}/3 - Error downloading {product_name}: {e}")
-    logging.error(f"Failed to download {product_name} after 3 attempts.")
-    return "N/A"
-
-def modify_image_url(image_url):
-    """Try to modify Shopify-style image URLs to use high resolution versions."""
-    if not image_url or image_url == "N/A":
-        return image_url
-
-    # Extract and preserve query parameters
-    query_params = ""
-    if "?" in image_url:
-        image_url, query_params = image_url.split("?", 1)
-        query_params = f"?{query_params}"
-
-    # Try common low-res suffix patterns and replace them
-    replacements = [
-        (r'(_\d+x\d+)(_crop_center)?(?=\.\w+$)', '_1220x1220_crop_center'),  # e.g., _600x600 or _600x600_crop_center
-        (r'_260(?=\.\w+$)', '_1200'),  # specific pattern like _260
-    ]
-
-    modified_url = image_url
-    for pattern, replacement in replacements:
-        modified_url = re.sub(pattern, replacement, modified_url)
-
-    return modified_url + query_params
-
-
-async def handle_grahams(url, max_pages):
-    ip_address = get_public_ip()
-    logging.info(f"Starting scrape for {url} from IP: {ip_address}")
-
-    if not os.path.exists(EXCEL_DATA_PATH):
-        os.makedirs(EXCEL_DATA_PATH)
-
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    image_folder = os.path.join(IMAGE_SAVE_PATH, timestamp)
-    os.makedirs(image_folder, exist_ok=True)
-
-    wb = Workbook()
-    sheet = wb.active
-    sheet.title = "Products"
-    headers = ["Current Date", "Header", "Product Name", "Image", "Kt", "Price", "Total Dia wt", "Time", "ImagePath"]
-    sheet.append(headers)
-
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    time_only = datetime.now().strftime("%H.%M")
-
-    seen_ids = set()
-    records = []
-    image_tasks = []
-
-    async with httpx.AsyncClient() as session:
-        load_more_clicks = 1
-        previous_count = 0
-
-        while load_more_clicks <= max_pages:
-            async with async_playwright() as p:
-                # Create a new browser instance for each page
-                browser = await p.chromium.connect_over_cdp(PROXY_URL)
-                page = await browser.new_page()
-
-                try:
-                    await page.goto(url, timeout=120000)
-                except Exception as e:
-                    logging.warning(f"Failed to load URL {url}: {e}")
-                    await browser.close()
-                    continue  # move to the next iteration
-
-                 # Simulate clicking 'Load More' number of times
-                for i in range(load_more_clicks - 1):
-                    try:
-                        # Scroll to bottom of the page
-                        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                        await asyncio.sleep(1)
-
-                        # Wait for the button to appear or timeout
-                        button = await page.query_selector("button.load-more")
-                        if button and await button.is_visible():
-                            await button.scroll_into_view_if_needed()
-                            await asyncio.sleep(0.5)
-                            await button.click()
-                            print(f"[Load More] Clicked load more button ({i + 1}/{load_more_clicks - 1})")
-                            new_count = len(await page.query_selector_all("li.column.ss__result--item"))
-                            previous_count = new_count  # Update to new count
-                        else:
-                            print("No more 'Load More' button or it's not visible.")
-                            break
-                    except Exception as e:
-                        print(f"[Load More Error] {e}")
-                        break
-
-                                    
-                all_products = await page.query_selector_all("li.column.ss__result.ss__result--item")
-
-                total_products = len(all_products)
-                new_products = all_products[previous_count:]
-                logging.info(f"Page {load_more_clicks}: Total = {total_products}, New = {len(new_products)}")
-                previous_count = total_products
-
-                print(f"Page {load_more_clicks}: Scraping {len(new_products)} new products.")
-                page_title = await page.title()
-
-                for idx, product in enumerate(new_products):
-                    try:
-                        name_tag = await product.query_selector("a.product-card-title")
-                        product_name = await name_tag.inner_text() if name_tag else "N/A"
-                    except Exception as e:
-                        print(f"[Product Name] Error: {e}")
-                        product_name = "N/A"
-
-                    try:
-                        price_tag = await product.query_selector("span.price")
-                        price = await price_tag.inner_text() if price_tag else "N/A"
-                    except Exception as e:
-                        print(f"[Price] Error: {e}")
-                        price = "N/A"
-
-                    try:
-                        await product.scroll_into_view_if_needed()
-                        img_tag = await product.query_selector(".product-primary-image.lazyautosizes.ls-is-cached.lazyloaded")
-                        image_url = await img_tag.get_attribute("src") if img_tag else "N/A"
-                        if image_url.startswith("//"):
-                            image_url = "https:" + image_url
-                    except Exception as e:
-                        print(f"[Image URL] Error: {e}")
-                        image_url = "N/A"
-
-                    
-                    
-                    
-                    image_url = modify_image_url(image_url)
-                        
-
-                    # Extract Gold Type (e.g., "14K Yellow Gold").
-                    gold_type_match = re.findall(r"(\d{1,2}ct\s*(?:Yellow|White|Rose)?\s*Gold|Platinum|Cubic Zirconia)", product_name, re.IGNORECASE)
-                    kt = ", ".join(gold_type_match) if gold_type_match else "N/A"
-
-                    # Extract Diamond Weight (supports "1.85ct", "2ct", "1.50ct", etc.)
-                    diamond_weight_match = re.findall(r"(\d+(?:\.\d+)?\s*ct)", product_name, re.IGNORECASE)
-                    diamond_weight = ", ".join(diamond_weight_match) if diamond_weight_match else "N/A"
-
-                    unique_id = str(uuid.uuid4())
-                    task = asyncio.create_task(download_image(session, image_url, product_name, timestamp, image_folder, unique_id))
-                    image_tasks.append((len(sheet['A']) + 1, unique_id, task))
-
-                    records.append((unique_id, current_date, page_title, product_name, None, kt, price, diamond_weight))
-                    sheet.append([current_date, page_title, product_name, None, kt, price, diamond_weight, time_only, image_url])
-
-                # Process image downloads and attach them to Excel
-                for row, unique_id, task in image_tasks:
-                    image_path = await task
-                    if image_path != "N/A":
-                        img = Image(image_path)
-                        img.width, img.height = 100, 100
-                        sheet.add_image(img, f"D{row}")
-                    for i, record in enumerate(records):
-                        if record[0] == unique_id:
-                            records[i] = (record[0], record[1], record[2], record[3], image_path, record[5], record[6], record[7])
-                            break
-
-                await browser.close()
-            load_more_clicks += 1
-
-        # Save Excel
-        filename = f'handle_grahams_{datetime.now().strftime("%Y-%m-%d_%H.%M")}.xlsx'
-        file_path = os.path.join(EXCEL_DATA_PATH, filename)
-        wb.save(file_path)
-        log_event(f"Data saved to {file_path} | IP: {ip_address}")
-
-        if records:
-            insert_into_db(records)
-        else:
-            logging.info("No data to insert into the database.")
-
-        update_product_count(len(seen_ids))
-
-        with open(file_path, "rb") as f:
-            base64_encoded = base64.b64encode(f.read()).decode("utf-8")
-
-        return base64_encoded, filename, file_path
+async def handle_grahams(url, max_pages, scrape_id=None, export_format="xlsx"):
+    return await scrape_site(url, max_pages, scrape_id=scrape_id, export_format=export_format)
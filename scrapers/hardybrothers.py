@@ -1,280 +1,5 @@
-import asyncio
-import re
-import os
-import uuid
-import logging
-import base64
-import random
-import time
-from datetime import datetime
-from io import BytesIO
+from scraper_engine import scrape_site
 
-import httpx
-from PIL import Image as PILImage
-from openpyxl import Workbook
-from openpyxl.drawing.image import Image as ExcelImage
-from flask import Flask
-from dotenv import load_dotenv
-from playwright.async_api import async_playwright, TimeoutError, Error
 
-from utils import get_public_ip, log_event, sanitize_filename
-from database import insert_into_db
-from limit_checker import update_product_count
-
-# Load environment
-load_dotenv()
-PROXY_URL = os.getenv("PROXY_URL")
-
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
-EXCEL_DATA_PATH = os.path.join(BASE_DIR, 'static', 'ExcelData')
-IMAGE_SAVE_PATH = os.path.join(BASE_DIR, 'static', 'Images')
-
-
-# Resize image if needed
-def resize_image(image_data, max_size=(100, 100)):
-    try:
-        img = PILImage.open(BytesIO(image_data))
-        img.thumbnail(max_size, PILImage.LANCZOS)
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG", quality=85)
-        return buffer.getvalue()
-    except Exception as e:
-        log_event(f"Error resizing image: {e}")
-        return image_data
-
-# Transform URL to get high-res image
-def modify_image_url(image_url):
-    """Upgrade image resolution by replacing _400x (or similar) with _800x."""
-    if not image_url or image_url == "N/A":
-        return image_url
-
-    # Extract query parameters (if any)
-    query_params = ""
-    if "?" in image_url:
-        image_url, query_params = image_url.split("?", 1)
-        query_params = f"?{query_params}"
-
-    # Replace the resolution part like '_400x' with '_800x'
-    modified_url = re.sub(r'_\d+x(?=\.\w+$)', '_800x', image_url)
-
-    return modified_url + query_params
-
-
-# Async image downloader
-async def download_image_async(image_url, product_name, timestamp, image_folder, unique_id, retries=3):
-    if not image_url or image_url == "N/A":
-        return "N/A"
-
-    image_filename = f"{unique_id}_{timestamp}.jpg"
-    image_full_path = os.path.join(image_folder, image_filename)
-    modified_url = modify_image_url(image_url)  # High-res version
-
-    async with httpx.AsyncClient(timeout=10.0) as client:
-        for attempt in range(retries):
-            try:
-                # Try high-res version first
-                response = await client.get(modified_url)
-                response.raise_for_status()
-                with open(image_full_path, "wb") as f:
-                    f.write(response.content)
-                return image_full_path
-            except httpx.HTTPStatusError as e:
-                # If high-res doesn't exist, fallback to original
-                if e.response.status_code == 404 and modified_url != image_url:
-                    logging.warning(f"High-res not found for {product_name}, trying original URL.")
-                    try:
-                        response = await client.get(image_url)
-                        response.raise_for_status()
-                        with open(image_full_path, "wb") as f:
-                            f.write(response.content)
-                        return image_full_path
-                    except Exception as fallback_err:
-                        logging.error(f"Fallback failed for {product_name}: {fallback_err}")
-                        break
-                else:
-                    logging.warning(f"HTTP error on attempt {attempt+1} for {product_name}: {e}")
-            except httpx.RequestError as e:
-                logging.warning(f"Request error on attempt {attempt+1} for {product_name}: {e}")
-    
-    logging.error(f"Failed to download image for {product_name} after {retries} attempts.")
-    return "N/A"
-
-# Human-like delay
-def random_delay(min_sec=1, max_sec=3):
-    time.sleep(random.uniform(min_sec, max_sec))
-
-# Reliable page.goto wrapper
-async def safe_goto_and_wait(page, url, retries=3):
-    for attempt in range(retries):
-        try:
-            print(f"[Attempt {attempt + 1}] Navigating to: {url}")
-            await page.goto(url, timeout=180_000, wait_until="domcontentloaded")
-            await page.wait_for_selector(".CollectionInner__Products", state="attached", timeout=30000)
-            print("[Success] Product cards loaded.")
-            return
-        except (Error, TimeoutError) as e:
-            logging.warning(f"Attempt {attempt + 1} failed for {url}: {e}")
-            if attempt < retries - 1:
-                random_delay(1, 3)
-            else:
-                raise
-
-# Main scraper function
-async def handle_hardybrothers(url, max_pages):
-    ip_address = get_public_ip()
-    logging.info(f"Scraping started for: {url} from IP: {ip_address}, max_pages: {max_pages}")
-
-    os.makedirs(EXCEL_DATA_PATH, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    image_folder = os.path.join(IMAGE_SAVE_PATH, timestamp)
-    os.makedirs(image_folder, exist_ok=True)
-
-    wb = Workbook()
-    sheet = wb.active
-    sheet.title = "Products"
-    headers = ["Current Date", "Header", "Product Name", "Image", "Kt", "Price", "Total Dia wt", "Time", "ImagePath"]
-    sheet.append(headers)
-
-    all_records = []
-    filename = f"handle_hardybrothers_{datetime.now().strftime('%Y-%m-%d_%H.%M')}.xlsx"
-    file_path = os.path.join(EXCEL_DATA_PATH, filename)
-
-    page_count = 1
-    
-    success_count = 0
-
-    while page_count <= max_pages:
-        current_url = f"{url}?loadMore={page_count}"
-        logging.info(f"Processing page {page_count}: {current_url}")
-        browser = None
-        page = None
-        try:
-            async with async_playwright() as p:
-                browser = await p.chromium.connect_over_cdp(PROXY_URL)
-                context = await browser.new_context()
-                page = await context.new_page()
-                page.set_default_timeout(120000)
-
-                await safe_goto_and_wait(page, current_url)
-                log_event(f"Successfully loaded: {current_url}")
-
-                # Scroll to load all items
-                prev_count = 0
-                for _ in range(10):
-                    await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                    await asyncio.sleep(random.uniform(1, 2))
-                    count = await page.locator('.CollectionInner__Products').count()
-                    if count == prev_count:
-                        break
-                    prev_count = count
-
-                page_title = await page.title()
-                current_date = datetime.now().strftime("%Y-%m-%d")
-                time_only = datetime.now().strftime("%H.%M")
-
-               
-                # Query for all product items
-                products = await page.query_selector_all("div.ProductListWrapper div.ProductItem")
-
-                # Log the total number of product items
-                logging.info(f"Total products scraped:{page_count}: {len(products)}")
-                
-                records = []
-                image_tasks = []
-
-                for row_num, product in enumerate(products, start=len(sheet["A"]) + 1):
-                    try:
-
-                        # Extract Product Name
-                        name_selector = "h2.ProductItem__Title.Heading a"
-                        name_element = await product.query_selector(name_selector)
-                        product_name = (await name_element.text_content()).strip() if name_element else "N/A"
-                    except:
-                        product_name = "N/A"
-
-                    try:
-                        price_element = await product.query_selector(".ProductItem__Price")
-                        price = (await price_element.text_content()).strip() if price_element else "N/A"
-                       
-                    except:
-                        price = "N/A"
-
-                    try:
-                        # Extract the image tag for the product
-                        image_tag = await product.query_selector("img.ProductItem__Image")
-
-                        # Get the highest resolution URL from the image attributes (data-src or src)
-                        highest_res_url = await image_tag.get_attribute("data-src") or await image_tag.get_attribute("srcset") or "N/A"
-
-                        # Check if the URL contains a placeholder for width (e.g., {width}), and replace it with 900 for the highest resolution
-                        if "{width}" in highest_res_url:
-                            highest_res_url = highest_res_url.replace("{width}", "800")
-
-                        # Ensure full URL format
-                        if highest_res_url.startswith("//"):
-                            image_url = f"https:{highest_res_url}"  # If the URL starts with "//", prepend "https:"
-                        else:
-                            image_url = highest_res_url  # If it's already a full URL, use it as is
-
-                        logging.info(f"Image URL: {image_url}")
-
-                    except:
-                        image_url = "N/A"
-
-                    gold_match = re.search(r"\b\d{1,2}K\s*(?:White|Yellow|Rose)?\s*Gold\b|\bPlatinum\b|\bSilver\b", product_name, re.IGNORECASE)
-                    kt = gold_match.group() if gold_match else "Not found"
-
-                    dia_match = re.search(r"\b(\d+(\.\d+)?)\s*(?:ct|ctw|carat)\b", product_name, re.IGNORECASE)
-                    diamond_weight = f"{dia_match.group(1)} ct" if dia_match else "N/A"
-
-                    unique_id = str(uuid.uuid4())
-                    image_tasks.append((row_num, unique_id, asyncio.create_task(
-                        download_image_async(image_url, product_name, timestamp, image_folder, unique_id)
-                    )))
-
-                    records.append((unique_id, current_date, page_title, product_name, None, kt, price, diamond_weight))
-                    sheet.append([current_date, page_title, product_name, None, kt, price, diamond_weight, time_only, image_url])
-
-                for row_num, unique_id, task in image_tasks:
-                    try:
-                        image_path = await asyncio.wait_for(task, timeout=60)
-                        if image_path != "N/A":
-                            try:
-                                img = ExcelImage(image_path)
-                                img.width, img.height = 100, 100
-                                sheet.add_image(img, f"D{row_num}")
-                            except Exception as e:
-                                logging.error(f"Error embedding image: {e}")
-                                image_path = "N/A"
-                        for i, record in enumerate(records):
-                            if record[0] == unique_id:
-                                records[i] = (record[0], record[1], record[2], record[3], image_path, record[5], record[6], record[7])
-                                break
-                    except asyncio.TimeoutError:
-                        logging.warning(f"Image download timed out for row {row_num}")
-                        
-                all_records.extend(records)
-                success_count += 1
-
-                # Save progress after each page
-                wb.save(file_path)
-                logging.info(f"Progress saved after page {page_count}")
-        except Exception as e:
-            logging.error(f"Error on page {page_count}: {str(e)}")
-            wb.save(file_path)
-        finally:
-            if page: await page.close()
-            if browser: await browser.close()
-            await asyncio.sleep(random.uniform(2, 5))
-
-        page_count += 1
-
-    wb.save(file_path)
-    log_event(f"Data saved to {file_path}")
-    with open(file_path, "rb") as file:
-        base64_encoded = base64.b64encode(file.read()).decode("utf-8")
-
-    insert_into_db(all_records)
-    update_product_count(len(all_records))
-
-    return base64_encoded, filename, file_path
+async def handle_hardybrothers(url, max_pages, scrape_id=None, export_format="xlsx"):
+    return await scrape_site(url, max_pages, scrape_id=scrape_id, export_format=export_format)
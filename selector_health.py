@@ -0,0 +1,192 @@
+import os
+import re
+import json
+import logging
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from playwright.async_api import TimeoutError, Error
+
+# After navigation the listing gets one short wait for its tiles. If they do not show
+# up the page is classified instead of being retried blindly: blocked pages are retried,
+# empty categories end pagination, and markup drift fails the scrape at once, unless
+# the page still carries schema.org Product data that structured_data can read.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DIAGNOSTICS_PATH = os.path.join(BASE_DIR, "logs", "diagnostics")
+HEALTH_FILE = os.path.join(BASE_DIR, "logs", "selector_health.json")
+PROBE_TIMEOUT = int(os.getenv("PROBE_TIMEOUT", 15000))
+HISTORY_SIZE = 50
+
+OK = "ok"
+BLOCKED = "blocked"
+EMPTY = "empty"
+DRIFT = "drift"
+# Tiles drifted but JSON-LD/microdata Products are present; scraped as OK
+STRUCTURED = "structured"
+
+BLOCKED_STATUSES = {401, 403, 407, 429, 503}
+
+BLOCKED_RE = re.compile(
+    r"captcha|verify you are (?:a )?human|are you a robot|access denied|attention required|"
+    r"request blocked|unusual traffic|pardon our interruption|just a moment|checking your browser|"
+    r"press (?:&|and) hold|incapsula|perimeterx|datadome",
+    re.IGNORECASE,
+)
+
+EMPTY_RE = re.compile(
+    r"no (?:products|results|items) (?:were )?(?:found|match|available)|0 (?:products|results|items)\b|"
+    r"no matching products|aucun (?:produit|résultat)|nessun (?:prodotto|risultato)|"
+    r"keine (?:produkte|ergebnisse)|brak produktów|nebyly nalezeny žádné|žádné produkty",
+    re.IGNORECASE,
+)
+
+# Collects what classify() needs in one round trip.
+PROBE_JS = """
+(tileSelector) => {
+    const text = (document.body && document.body.innerText) || '';
+    const frames = [...document.querySelectorAll('iframe')].map(f => f.src || '').join(' ');
+    let structured = document.querySelectorAll('[itemscope][itemtype*="schema.org/Product"]').length;
+    const visit = (node) => {
+        if (!node || typeof node !== 'object') return;
+        if (Array.isArray(node)) { node.forEach(visit); return; }
+        if ([].concat(node['@type'] || []).map(String).includes('Product')) { structured++; return; }
+        if (node['@graph']) visit(node['@graph']);
+        if (node.itemListElement) visit(node.itemListElement);
+        if (node.item) visit(node.item);
+    };
+    for (const script of document.querySelectorAll('script[type="application/ld+json"]')) {
+        try { visit(JSON.parse(script.textContent)); } catch (e) {}
+    }
+    return {
+        tiles: document.querySelectorAll(tileSelector).length,
+        structured,
+        title: document.title || '',
+        text: text.slice(0, 5000),
+        textLength: text.length,
+        frames: frames.slice(0, 2000),
+    };
+}
+"""
+
+_health_lock = threading.Lock()
+
+
+class SelectorDriftError(Exception):
+    """The page loaded but its markup no longer matches the site's selectors."""
+
+
+class PageBlockedError(Exception):
+    """The page is a bot wall or captcha instead of the listing."""
+
+
+def classify(probe, status=None, structured=True):
+    """
+    Classify a listing without tiles as blocked, empty or drift, or as structured when
+    structured data is read for the site and the page still has Product data.
+    """
+    if probe["tiles"]:
+        return OK
+    if status in BLOCKED_STATUSES:
+        return BLOCKED
+    if BLOCKED_RE.search(probe["title"]) or BLOCKED_RE.search(probe["frames"]):
+        return BLOCKED
+    # Bot walls are short pages; a full storefront that merely mentions "captcha" is not one
+    if probe["textLength"] < 2000 and BLOCKED_RE.search(probe["text"]):
+        return BLOCKED
+    if status == 404 or EMPTY_RE.search(probe["text"]):
+        return EMPTY
+    if structured and probe.get("structured"):
+        return STRUCTURED
+    return DRIFT
+
+
+def load_health():
+    try:
+        with open(HEALTH_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_outcome(url, outcome, detail=None):
+    """Add a probe outcome to the per-domain health history in logs/selector_health.json."""
+    domain = urlparse(url).netloc.lower()
+    now = datetime.now().isoformat(timespec="seconds")
+    with _health_lock:
+        health = load_health()
+        site = health.setdefault(domain, {"counts": {}, "history": [], "consecutive_failures": 0})
+        site["counts"][outcome] = site["counts"].get(outcome, 0) + 1
+        site["last_outcome"] = outcome
+        site["last_seen"] = now
+        site["consecutive_failures"] = 0 if outcome in (OK, EMPTY) else site["consecutive_failures"] + 1
+        if outcome == DRIFT:
+            site["last_drift"] = now
+        site["history"] = (site["history"] + [{"time": now, "url": url, "outcome": outcome, "detail": detail}])[-HISTORY_SIZE:]
+        os.makedirs(os.path.dirname(HEALTH_FILE), exist_ok=True)
+        tmp_path = f"{HEALTH_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(health, f, indent=2)
+        os.replace(tmp_path, HEALTH_FILE)
+
+
+async def save_diagnostics(page, url):
+    """Save the page HTML and a screenshot under logs/diagnostics and return the HTML path."""
+    os.makedirs(DIAGNOSTICS_PATH, exist_ok=True)
+    domain = urlparse(url).netloc.lower().replace(":", "_")
+    base = os.path.join(DIAGNOSTICS_PATH, f"{domain}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    try:
+        with open(f"{base}.html", "w", encoding="utf-8") as f:
+            f.write(await page.content())
+        await page.screenshot(path=f"{base}.png", full_page=True, timeout=15000)
+    except (OSError, Error, TimeoutError) as e:
+        logging.warning(f"Could not save diagnostics for {url}: {e}")
+    return f"{base}.html"
+
+
+async def probe_listing(page, url, selectors, status=None, structured=True):
+    """
+    Wait briefly for the listing and classify the page when it does not render.
+
+    Returns OK, BLOCKED or EMPTY and records the outcome; raises SelectorDriftError
+    (after saving a diagnostic snapshot) when the markup no longer matches and, with
+    structured, the page has no JSON-LD/microdata Products to fall back on.
+    """
+    tile_selector = selectors["tile_selector"]
+    wait_selector = selectors.get("wait_selector") or tile_selector
+    try:
+        await page.wait_for_selector(wait_selector, state="attached", timeout=PROBE_TIMEOUT)
+        if wait_selector != tile_selector:
+            # The container can still render when only the tile markup has changed
+            await page.wait_for_selector(tile_selector, state="attached", timeout=PROBE_TIMEOUT)
+        record_outcome(url, OK)
+        return OK
+    except (Error, TimeoutError):
+        pass
+
+    try:
+        probe = await page.evaluate(PROBE_JS, tile_selector)
+    except Error as e:
+        logging.warning(f"Selector probe failed on {url}: {e}")
+        record_outcome(url, BLOCKED, str(e)[:200])
+        return BLOCKED
+
+    outcome = classify(probe, status, structured)
+    if outcome == OK:
+        logging.warning(f"Probe timed out on {url} but {probe['tiles']} {tile_selector!r} tiles matched")
+    elif outcome == STRUCTURED:
+        # Recorded separately so the health history still shows the drift
+        logging.warning(
+            f"No {tile_selector!r} tiles on {url}; reading its {probe['structured']} structured products instead"
+        )
+        record_outcome(url, outcome, probe["title"][:200])
+        return OK
+    elif outcome == DRIFT:
+        snapshot = await save_diagnostics(page, url)
+        record_outcome(url, outcome, snapshot)
+        raise SelectorDriftError(
+            f"No {tile_selector!r} tiles on {url} ({probe['title']!r}); markup changed, snapshot saved to {snapshot}"
+        )
+    else:
+        logging.warning(f"Listing {url} classified as {outcome} ({probe['title']!r})")
+    record_outcome(url, outcome, probe["title"][:200])
+    return outcome
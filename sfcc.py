@@ -0,0 +1,109 @@
+import logging
+from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse
+from snapshot_parser import parse_snapshot
+
+# Salesforce Commerce Cloud (Demandware) storefronts render 41 tiles per grid
+# page but accept much larger `sz` windows on the same endpoint. Windows are
+# fetched as HTML and always parsed in the snapshot pool, OFFLINE_PARSING or not;
+# the browser stays open only to fetch them with the session's cookies.
+SFCC_PAGE_SIZE = 41
+SFCC_WINDOW_SIZE = 300
+
+UPDATE_GRID_SELECTOR = "[data-url*='Search-UpdateGrid']"
+
+FETCH_FRAGMENT_JS = """
+async (url) => {
+    const response = await fetch(url, {
+        credentials: 'include',
+        headers: {'X-Requested-With': 'XMLHttpRequest'}
+    });
+    if (!response.ok) {
+        return null;
+    }
+    return await response.text();
+}
+"""
+
+
+def build_grid_url(grid_url, start, size):
+    """Return grid_url with its `start` and `sz` query parameters replaced."""
+    parts = urlparse(grid_url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query["start"] = str(start)
+    query["sz"] = str(size)
+    return urlunparse(parts._replace(query=urlencode(query)))
+
+
+async def find_update_grid_url(page, url):
+    """Return the Search-UpdateGrid AJAX URL advertised by the page, or the category URL itself."""
+    try:
+        data_url = await page.get_attribute(UPDATE_GRID_SELECTOR, "data-url", timeout=2000)
+    except Exception:
+        data_url = None
+
+    if data_url:
+        if data_url.startswith("/"):
+            parts = urlparse(url)
+            data_url = f"{parts.scheme}://{parts.netloc}{data_url}"
+        logging.info(f"Using Search-UpdateGrid endpoint: {data_url}")
+        return data_url
+    return url
+
+
+async def fetch_grid_fragment(page, grid_url):
+    """Fetch a grid window from inside the page so cookies and consent state are reused."""
+    try:
+        return await page.evaluate(FETCH_FRAGMENT_JS, grid_url)
+    except Exception as e:
+        logging.warning(f"Failed to fetch grid fragment {grid_url}: {e}")
+        return None
+
+
+def grid_fields(selectors):
+    """Build the extraction field map for an SFCC product tile."""
+    return {
+        "product_name": selectors["name"],
+        "price": selectors["price"],
+        "image_url": {"selector": selectors["image"], "attr": "candidates"},
+    }
+
+
+async def fetch_sfcc_products(page, url, max_products, selectors, window_size=SFCC_WINDOW_SIZE, on_fragment=None):
+    """
+    Collect up to max_products tiles from an SFCC category using large `sz` windows.
+
+    The page must already be on the category URL with any consent popup dismissed.
+    on_fragment, when given, is awaited with (window_url, html) for every fragment parsed.
+    """
+    grid_url = await find_update_grid_url(page, url)
+    products = []
+    previous = None
+    start = 0
+
+    while start < max_products:
+        size = min(window_size, max_products - start)
+        window_url = build_grid_url(grid_url, start, size)
+        html = await fetch_grid_fragment(page, window_url)
+        if not html:
+            break
+        if on_fragment:
+            await on_fragment(window_url, html)
+
+        window_products = await parse_snapshot(html, selectors["tile"], grid_fields(selectors), base_url=url)
+        logging.info(f"SFCC window start={start} sz={size}: {len(window_products)} products")
+        # Storefronts may cap sz below what was asked, so only an empty window (or one
+        # repeating the previous, when start is ignored) means the category is done
+        if not window_products or window_products == previous:
+            break
+        products.extend(window_products)
+        previous = window_products
+        start += len(window_products)
+
+    if not products:
+        logging.warning("SFCC grid windows returned nothing, parsing the rendered page instead.")
+        html = await page.content()
+        if on_fragment:
+            await on_fragment(url, html)
+        products = await parse_snapshot(html, selectors["tile"], grid_fields(selectors), base_url=url)
+
+    return products[:max_products]
@@ -0,0 +1,30 @@
+import os
+import json
+from urllib.parse import urlparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WEBSITES_FILE = os.path.join(BASE_DIR, "websites.json")
+
+
+def load_websites():
+    """Load the per-site configuration list from websites.json."""
+    with open(WEBSITES_FILE, "r") as file:
+        return json.load(file)["websites"]
+
+
+def get_site_config(url):
+    """Return the websites.json entry whose domain matches url, or an empty dict."""
+    domain = urlparse(url).netloc.lower()
+    for site in load_websites():
+        if urlparse(site["url"]).netloc.lower() == domain:
+            return site
+    return {}
+
+
+def clean_price(price, strip):
+    """Remove a site's `price_strip` tokens (currency symbols, separators, "from") from a price."""
+    if not strip or price in (None, "N/A"):
+        return price
+    for token in strip:
+        price = price.replace(token, "")
+    return price.strip()
@@ -0,0 +1,110 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from extraction import normalize_fields
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# When enabled, the paginated-URL, cursor and in-page (load more / infinite scroll)
+# collectors capture page.content() once, release the browser and parse the snapshot
+# in a worker process instead of querying the live DOM. SFCC grid windows are always
+# parsed here (see sfcc); the WooCommerce adapter reads JSON and parses no HTML.
+OFFLINE_PARSING = os.getenv("OFFLINE_PARSING", "0").lower() in ("1", "true", "yes")
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", os.cpu_count() or 1))
+
+_parse_pool = None
+
+
+def get_parse_pool():
+    """Return the process pool shared by every snapshot parse, creating it on first use."""
+    global _parse_pool
+    if _parse_pool is None:
+        _parse_pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS)
+    return _parse_pool
+
+
+CANDIDATE_ATTRS = ("srcset", "data-srcset", "data-lazy-srcset", "data-src", "data-lazy-src", "src")
+
+
+def _candidates(element):
+    parts = []
+    picture = element.find_parent("picture")
+    if picture is not None:
+        for source in picture.find_all("source"):
+            value = source.get("srcset") or source.get("data-srcset")
+            if value:
+                parts.append(value)
+    for name in CANDIDATE_ATTRS:
+        value = element.get(name)
+        if value and not value.startswith("data:"):
+            parts.append(value)
+    return "\n".join(parts)
+
+
+def _read(element, attr):
+    if attr == "candidates":
+        return _candidates(element)
+    if attr == "text":
+        return " ".join(element.get_text(" ", strip=True).split())
+    if attr == "html":
+        return element.decode_contents()
+    value = element.get(attr)
+    if isinstance(value, list):
+        value = " ".join(value)
+    return (value or "").strip()
+
+
+def select_tiles(tiles, fields, missing="N/A", base_url=None):
+    """Read the fields of already selected BeautifulSoup tile elements."""
+    fields = normalize_fields(fields)
+    products = []
+    for tile in tiles:
+        record = {}
+        for name, spec in fields.items():
+            element = tile.select_one(spec["selector"]) if spec["selector"] else tile
+            value = ""
+            if element is not None:
+                for attr in spec["attrs"]:
+                    value = _read(element, attr)
+                    if value:
+                        break
+            if value and spec["url"]:
+                value = "https:" + value if value.startswith("//") else urljoin(base_url or "", value)
+            record[name] = value or missing
+        products.append(record)
+    return products
+
+
+def parse_tiles_html(html, tile_selector, fields, missing="N/A", base_url=None):
+    """
+    Parse tiles out of an HTML snapshot with BeautifulSoup.
+
+    Uses the same selector map as extraction.extract_tiles, so a handler can switch
+    between live-DOM and snapshot parsing without changing its field definitions.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+    return select_tiles(soup.select(tile_selector), fields, missing, base_url)
+
+
+async def parse_snapshot(html, tile_selector, fields, missing="N/A", base_url=None):
+    """Parse an HTML snapshot in the worker pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    job = partial(parse_tiles_html, html, tile_selector, fields, missing, base_url)
+    try:
+        return await loop.run_in_executor(get_parse_pool(), job)
+    except Exception as e:
+        logging.error(f"Snapshot parsing failed for {tile_selector}: {e}")
+        return []
+
+
+async def capture_snapshot(page):
+    """Capture the rendered HTML and title of a page so the tab can be released."""
+    return await page.content(), await page.title()
@@ -0,0 +1,264 @@
+import json
+import html
+import asyncio
+import logging
+from functools import partial
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup
+from extraction import extract_tiles
+from snapshot_parser import HTML_PARSER, get_parse_pool, select_tiles
+
+# Runs inside the page: returns every schema.org Product found in JSON-LD blocks
+# (including @graph and ItemList wrappers) and in Product microdata.
+EXTRACT_STRUCTURED_JS = """
+() => {
+    const jsonld = [];
+    const visit = (node) => {
+        if (!node || typeof node !== 'object') return;
+        if (Array.isArray(node)) { node.forEach(visit); return; }
+        const types = [].concat(node['@type'] || []).map(String);
+        if (types.includes('Product')) { jsonld.push(node); return; }
+        if (node['@graph']) visit(node['@graph']);
+        if (node.itemListElement) visit(node.itemListElement);
+        if (node.item) visit(node.item);
+    };
+    for (const script of document.querySelectorAll('script[type="application/ld+json"]')) {
+        try { visit(JSON.parse(script.textContent)); } catch (e) {}
+    }
+
+    const microdata = [];
+    for (const el of document.querySelectorAll('[itemscope][itemtype*="schema.org/Product"]')) {
+        const prop = (name) => {
+            const p = el.querySelector(`[itemprop="${name}"]`);
+            if (!p) return null;
+            return p.getAttribute('content') || p.getAttribute('src') || p.getAttribute('href')
+                || (p.textContent || '').trim() || null;
+        };
+        microdata.push({
+            name: prop('name'), image: prop('image'), sku: prop('sku'), url: prop('url'),
+            offers: {price: prop('price'), priceCurrency: prop('priceCurrency')},
+        });
+    }
+    return {jsonld, microdata};
+}
+"""
+
+CURRENCY_SYMBOLS = {"USD": "$", "AUD": "$", "CAD": "$", "NZD": "$", "GBP": "£", "EUR": "€", "INR": "₹", "PLN": "zł ", "CZK": "Kč ", "ZAR": "R"}
+
+REQUIRED_FIELDS = ("product_name", "price", "image_url")
+# Storefront text kept over the structured value whenever the tile has it, so stored
+# names and prices read the same as before structured data was used
+TILE_TEXT_FIELDS = ("product_name", "price")
+
+
+def _first(value):
+    if isinstance(value, list):
+        return _first(value[0]) if value else None
+    if isinstance(value, dict):
+        return value.get("url") or value.get("contentUrl") or value.get("@id")
+    return value
+
+
+def _offer(offers):
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if not isinstance(offers, dict):
+        return None, None
+    price = offers.get("price") or offers.get("lowPrice")
+    spec = offers.get("priceSpecification")
+    if price is None and isinstance(spec, dict):
+        price = spec.get("price")
+    return price, offers.get("priceCurrency")
+
+
+def format_price(price, currency):
+    """Format a structured price like the storefront ("$1,299.00"), keeping unknown values as-is."""
+    if price in (None, ""):
+        return "N/A"
+    symbol = CURRENCY_SYMBOLS.get(currency or "", f"{currency} " if currency else "")
+    try:
+        return f"{symbol}{float(str(price).replace(',', '')):,.2f}"
+    except ValueError:
+        return f"{symbol}{price}"
+
+
+def normalize_product(node, base_url=None):
+    """Map a schema.org Product node into the product dict used by the engine."""
+    name = html.unescape(str(node.get("name") or "")).strip()
+    price, currency = _offer(node.get("offers"))
+    image = _first(node.get("image"))
+    url = _first(node.get("url"))
+    return {
+        "product_name": name or "N/A",
+        "price": format_price(price, currency),
+        "currency": currency or None,
+        "image_url": urljoin(base_url or "", image) if image else "N/A",
+        "sku": str(node["sku"]) if node.get("sku") else None,
+        "url": urljoin(base_url or "", url) if url else None,
+    }
+
+
+def normalize_structured(found, base_url=None):
+    """Normalize the JSON-LD and microdata products of one page, dropping nameless duplicates."""
+    products = []
+    seen = set()
+    for node in found.get("jsonld", []) + found.get("microdata", []):
+        product = normalize_product(node, base_url)
+        key = product["sku"] or product["url"] or product["product_name"]
+        if product["product_name"] == "N/A" or key in seen:
+            continue
+        seen.add(key)
+        products.append(product)
+    return products
+
+
+def _visit_jsonld(node, out):
+    if isinstance(node, list):
+        for item in node:
+            _visit_jsonld(item, out)
+        return
+    if not isinstance(node, dict):
+        return
+    types = node.get("@type") or []
+    if "Product" in (types if isinstance(types, list) else [types]):
+        out.append(node)
+        return
+    for key in ("@graph", "itemListElement", "item"):
+        if key in node:
+            _visit_jsonld(node[key], out)
+
+
+def structured_from_soup(soup):
+    """BeautifulSoup counterpart of EXTRACT_STRUCTURED_JS for HTML snapshots."""
+    jsonld = []
+    for script in soup.select('script[type="application/ld+json"]'):
+        try:
+            _visit_jsonld(json.loads(script.string or script.get_text()), jsonld)
+        except ValueError:
+            continue
+
+    microdata = []
+    for element in soup.select('[itemscope][itemtype*="schema.org/Product"]'):
+        def prop(name):
+            p = element.select_one(f'[itemprop="{name}"]')
+            if p is None:
+                return None
+            return p.get("content") or p.get("src") or p.get("href") or p.get_text(strip=True) or None
+
+        microdata.append({
+            "name": prop("name"), "image": prop("image"), "sku": prop("sku"), "url": prop("url"),
+            "offers": {"price": prop("price"), "priceCurrency": prop("priceCurrency")},
+        })
+    return {"jsonld": jsonld, "microdata": microdata}
+
+
+def is_complete(products, tile_count):
+    """True when structured data covers every tile and every required field."""
+    return bool(products) and len(products) >= tile_count and all(
+        product[field] != "N/A" for product in products for field in REQUIRED_FIELDS
+    )
+
+
+def _name_key(name):
+    return " ".join((name or "").lower().split())
+
+
+def candidate_fields(fields):
+    """
+    The image field when it is read with attr "candidates". The tile lists every size
+    of the image while structured data usually has only the full-size one, so it has
+    to come from the tile.
+    """
+    spec = fields.get("image_url")
+    attrs = spec.get("attr") if isinstance(spec, dict) else None
+    return {"image_url"} if "candidates" in ([attrs] if isinstance(attrs, str) else attrs or []) else set()
+
+
+def tile_only_fields(fields, prefer_tile):
+    """Field map for a complete structured listing: the tile fields it lacks, plus names to match them by."""
+    return {name: fields[name] for name in ("product_name", *sorted(prefer_tile)) if name in fields}
+
+
+def merge_products(structured, tiles, prefer_tile=()):
+    """
+    Combine structured products with the DOM tiles.
+
+    The tile's name and price text and the fields in prefer_tile are kept whenever
+    the tile has them; structured values fill everything else. Tiles are matched to
+    structured products by name, or by position when both lists have the same
+    length. Unmatched tiles are kept as scraped.
+    """
+    if not structured:
+        return tiles
+    if not tiles:
+        return structured
+
+    by_name = {_name_key(p["product_name"]): p for p in structured}
+    positional = len(structured) == len(tiles)
+    keep_tile = set(TILE_TEXT_FIELDS) | set(prefer_tile)
+    merged = []
+    for index, tile in enumerate(tiles):
+        match = by_name.get(_name_key(tile.get("product_name")))
+        if match is None and positional:
+            match = structured[index]
+        if match is None:
+            merged.append(tile)
+            continue
+        product = dict(match)
+        for field, value in tile.items():
+            if product.get(field) in (None, "N/A") or (field in keep_tile and value not in (None, "", "N/A")):
+                product[field] = value
+        merged.append(product)
+    return merged
+
+
+async def extract_structured(page, base_url=None):
+    """Collect the structured products of a live page in one evaluate call."""
+    try:
+        found = await page.evaluate(EXTRACT_STRUCTURED_JS)
+    except Exception as e:
+        logging.warning(f"Structured data extraction failed: {e}")
+        return []
+    return normalize_structured(found, base_url or page.url)
+
+
+async def extract_products(page, tile_selector, fields, base_url=None):
+    """
+    Extract a listing from the live page, structured data first.
+
+    When JSON-LD/microdata covers every tile and field, the tiles are only read for
+    image candidates (if the site uses them); otherwise every field is read from the
+    tiles to fill the gaps.
+    """
+    structured = await extract_structured(page, base_url)
+    prefer_tile = candidate_fields(fields)
+    if structured and is_complete(structured, await page.locator(tile_selector).count()):
+        logging.info(f"Structured data covered all {len(structured)} products")
+        if not prefer_tile:
+            return structured
+        fields = tile_only_fields(fields, prefer_tile)
+    return merge_products(structured, await extract_tiles(page, tile_selector, fields), prefer_tile)
+
+
+def parse_products_html(html_text, tile_selector, fields, missing="N/A", base_url=None):
+    """Snapshot counterpart of extract_products, run in the parse pool."""
+    soup = BeautifulSoup(html_text, HTML_PARSER)
+    structured = normalize_structured(structured_from_soup(soup), base_url)
+    tiles = soup.select(tile_selector)
+    prefer_tile = candidate_fields(fields)
+    if is_complete(structured, len(tiles)):
+        if not prefer_tile:
+            return structured
+        fields = tile_only_fields(fields, prefer_tile)
+    return merge_products(structured, select_tiles(tiles, fields, missing, base_url), prefer_tile)
+
+
+async def parse_snapshot_products(html_text, tile_selector, fields, base_url=None):
+    """Parse a snapshot's structured data and tiles in the worker pool."""
+    loop = asyncio.get_running_loop()
+    job = partial(parse_products_html, html_text, tile_selector, fields, "N/A", base_url)
+    try:
+        return await loop.run_in_executor(get_parse_pool(), job)
+    except Exception as e:
+        logging.error(f"Snapshot parsing failed for {tile_selector}: {e}")
+        return []
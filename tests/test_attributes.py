@@ -0,0 +1,32 @@
+import pytest
+
+from attributes import parse_attributes, parse_attributes_batch
+
+
+@pytest.mark.parametrize("name, kt, diamond_weight", [
+    ("1/2 ct tw Diamond Engagement Ring 14K White Gold", "14K White Gold", "0.5 ct"),
+    ("Lab-Grown Diamonds by KAY Necklace 1 1/2 ct tw 10K Yellow Gold 18\"", "10K Yellow Gold", "1.5 ct"),
+    ("Diamond Anniversary Band 1-1/2 CT. T.W. 14K Gold", "14K Gold", "1.5 ct"),
+    ("9ct Rose Gold 0.25 Carat Diamond Halo Pendant", "9K Rose Gold", "0.25 ct"),
+    ("Platinum Solitaire Ring 1.00ct", "Platinum", "1 ct"),
+    ("Sterling Silver Cubic Zirconia Stud Earrings", "Sterling Silver", "N/A"),
+    ("Bague or blanc 750 diamants 3/4 carat", "18K", "0.75 ct"),
+    # Decimal commas and "carats" as karat on the FR/IT/PL sites
+    ("Bague Or jaune 375/1000 et diamants 0,10 carat", "9K", "0.1 ct"),
+    ("Anello oro bianco 18kt con diamanti 0,30 ct", "18K", "0.3 ct"),
+    ("Pierścionek złoty 585 z diamentem 0,05 ct", "14K", "0.05 ct"),
+    ("Bague or blanc 18 carats diamant 0,25 carat", "18K", "0.25 ct"),
+])
+def test_parse_attributes(name, kt, diamond_weight):
+    attributes = parse_attributes(name)
+    assert (attributes.kt, attributes.diamond_weight) == (kt, diamond_weight)
+
+
+def test_missing_name():
+    assert parse_attributes("N/A").kt == "N/A"
+    assert parse_attributes_batch(["", "N/A"])[0].diamond_weight == "N/A"
+
+
+def test_batch_parses_repeated_names_once():
+    first, second = parse_attributes_batch(["14K Gold Ring 1 ct tw"] * 2)
+    assert first is second
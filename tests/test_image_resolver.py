@@ -0,0 +1,29 @@
+import pytest
+
+from image_resolver import parse_srcset, resolve_image
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("a.jpg 1x, b.jpg 2x", [("a.jpg", None, 1.0), ("b.jpg", None, 2.0)]),
+    # No space after the comma
+    ("a.jpg 1x,b.jpg 2x", [("a.jpg", None, 1.0), ("b.jpg", None, 2.0)]),
+    ("a.jpg 100w,b.jpg 200w", [("a.jpg", 100, None), ("b.jpg", 200, None)]),
+    # Commas inside a URL belong to it
+    ("https://res.cloudinary.com/shop/image/upload/w_200,h_300/ring.jpg 200w,"
+     "https://res.cloudinary.com/shop/image/upload/w_400,h_600/ring.jpg 400w",
+     [("https://res.cloudinary.com/shop/image/upload/w_200,h_300/ring.jpg", 200, None),
+      ("https://res.cloudinary.com/shop/image/upload/w_400,h_600/ring.jpg", 400, None)]),
+    # Newline-joined srcsets and plain URLs from the "candidates" rule
+    ("a.jpg 200w, b.jpg 400w\nc.jpg", [("a.jpg", 200, None), ("b.jpg", 400, None), ("c.jpg", None, None)]),
+    ("data:image/gif;base64,R0lGOD 1x\nc.jpg", [("c.jpg", None, None)]),
+    ("N/A", []),
+])
+def test_parse_srcset(value, expected):
+    assert [tuple(candidate) for candidate in parse_srcset(value)] == expected
+
+
+def test_resolve_image_picks_the_smallest_sufficient_candidate():
+    thumbnail, archive = resolve_image("/i/a-100.jpg 100w,/i/a-300.jpg 300w,/i/a-900.jpg 900w",
+                                       "https://shop.example.com/rings", target_width=200)
+    assert thumbnail == "https://shop.example.com/i/a-300.jpg"
+    assert archive == "https://shop.example.com/i/a-900.jpg"
@@ -0,0 +1,18 @@
+import pytest
+
+from site_config import clean_price, get_site_config
+
+
+@pytest.mark.parametrize("url, price, expected", [
+    ("https://diamondcollective.com/collections/rings", "$1,250.00", "1250.00"),
+    ("https://mariemas.com/collections/rings", "€1,480", "1480"),
+    ("https://tmcfinejewellers.com/collections/rings", "Rs. 45,000", "45000"),
+    ("https://natashaschweitzer.com/collections/rings", "from AUD 2,450", "2,450"),
+])
+def test_price_strip_matches_the_old_site_handlers(url, price, expected):
+    assert clean_price(price, get_site_config(url)["price_strip"]) == expected
+
+
+def test_prices_are_kept_without_price_strip():
+    assert clean_price("$1,250.00", get_site_config("https://www.jared.com/c/rings").get("price_strip")) == "$1,250.00"
+    assert clean_price("N/A", ["$", ","]) == "N/A"
@@ -0,0 +1,47 @@
+import json
+
+from structured_data import candidate_fields, parse_products_html
+
+FIELDS = {
+    "product_name": "h2",
+    "price": "span.price",
+    "image_url": {"selector": "img", "attr": "candidates"},
+    "details": "p.details",
+}
+
+
+def listing(products, tiles):
+    jsonld = json.dumps({"@type": "ItemList", "itemListElement": [
+        {"@type": "Product", "name": name, "image": f"https://cdn.example.com/{name}-full.jpg",
+         "offers": {"price": price, "priceCurrency": "USD"}}
+        for name, price in products
+    ]})
+    body = "".join(
+        f'<div class="tile"><h2>{name}</h2><span class="price">{price}</span><p class="details">Details</p>'
+        f'<img srcset="https://cdn.example.com/{name}-200.jpg 200w, https://cdn.example.com/{name}-800.jpg 800w"></div>'
+        for name, price in tiles
+    )
+    return f'<html><script type="application/ld+json">{jsonld}</script><body>{body}</body></html>'
+
+
+def test_only_candidate_images_need_the_tile():
+    assert candidate_fields(FIELDS) == {"image_url"}
+    assert candidate_fields({"product_name": "h2", "image_url": "img"}) == set()
+
+
+def test_complete_structured_data_reads_only_images_from_tiles():
+    html = listing([("Ring", "1299"), ("Band", "99.5")], [("Ring", "$1,299"), ("Band", "$99.50")])
+    products = parse_products_html(html, "div.tile", FIELDS)
+    assert [product["price"] for product in products] == ["$1,299.00", "$99.50"]
+    assert all(" 200w" in product["image_url"] for product in products)
+    # Details were not needed, so they were not read
+    assert all("details" not in product for product in products)
+
+
+def test_incomplete_structured_data_keeps_the_storefront_price():
+    html = listing([("Ring", "1299")], [("Ring", "$1,299"), ("Band", "$99.50")])
+    ring, band = parse_products_html(html, "div.tile", FIELDS)
+    assert ring["price"] == "$1,299"
+    assert ring["currency"] == "USD"
+    assert band == {"product_name": "Band", "price": "$99.50", "details": "Details",
+                    "image_url": band["image_url"]}
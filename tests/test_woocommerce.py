@@ -0,0 +1,133 @@
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from woocommerce import (
+    STORE_API_PATH,
+    category_slug,
+    fetch_woocommerce_products,
+    format_price,
+    map_product,
+)
+
+CATEGORIES = [
+    {"id": 12, "slug": "engagement-rings", "name": "Engagement Rings"},
+    {"id": 15, "slug": "earrings", "name": "Earrings"},
+]
+
+
+def store_product(index):
+    return {
+        "id": index,
+        "name": f"Solitaire &amp; Halo Ring {index}",
+        "sku": f"SKU-{index}",
+        "prices": {"price": str(129900 + index), "currency_minor_unit": 2, "currency_prefix": "$", "currency_suffix": ""},
+        "images": [{"src": f"https://cdn.example.com/ring-{index}.jpg"}],
+    }
+
+
+class FixtureStore(BaseHTTPRequestHandler):
+    """Canned WooCommerce storefront: a catalogue page plus the Store API endpoints."""
+
+    products = [store_product(index) for index in range(1, 6)]
+    requests = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.requests.append((url.path, query))
+        if url.path == f"{STORE_API_PATH}/categories":
+            self.send_json(CATEGORIES)
+        elif url.path == STORE_API_PATH:
+            per_page, page = int(query.get("per_page", 10)), int(query.get("page", 1))
+            if "category" in query and query["category"] != "12":
+                self.send_json([])
+            else:
+                self.send_json(self.products[(page - 1) * per_page:page * per_page])
+        elif url.path.startswith("/product-category/") or url.path == "/jewellery/":
+            body = b"<html><head><title>Engagement Rings</title></head><body class='woocommerce'></body></html>"
+            self.send_body(body, "text/html")
+        elif url.path == "/plain/":
+            self.send_body(b"<html><head><title>Plain</title></head><body></body></html>", "text/html")
+        else:
+            self.send_error(404)
+
+    def send_json(self, data):
+        self.send_body(json.dumps(data).encode("utf-8"), "application/json")
+
+    def send_body(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def store():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureStore)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    FixtureStore.requests = []
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(url, max_pages=5, page_size=2):
+    return asyncio.run(fetch_woocommerce_products(url, max_pages, page_size=page_size))
+
+
+def test_format_price():
+    assert format_price({"price": "129900", "currency_minor_unit": 2, "currency_prefix": "$"}) == "$1,299.00"
+    assert format_price({"price": "5000", "currency_minor_unit": 0, "currency_suffix": " Kč"}) == "5,000 Kč"
+    assert format_price({"price": ""}) == "N/A"
+    assert format_price(None) == "N/A"
+
+
+def test_map_product():
+    assert map_product(store_product(1)) == {
+        "product_name": "Solitaire & Halo Ring 1",
+        "price": "$1,299.01",
+        "image_url": "https://cdn.example.com/ring-1.jpg",
+        "sku": "SKU-1",
+    }
+    assert map_product({"name": "", "images": []}) == {
+        "product_name": "N/A", "price": "N/A", "image_url": "N/A", "sku": None,
+    }
+
+
+def test_category_slug():
+    assert category_slug("https://shop.example/product-category/engagement-rings/page/3/") == "engagement-rings"
+    assert category_slug("https://shop.example/") is None
+
+
+def test_reads_category_through_store_api(store):
+    page_title, products = fetch(f"{store}/product-category/engagement-rings/")
+    assert page_title == "Engagement Rings"
+    assert [product["sku"] for product in products] == [f"SKU-{index}" for index in range(1, 6)]
+
+    pages = [query for path, query in FixtureStore.requests if path == STORE_API_PATH and query.get("per_page") == "2"]
+    assert [query["page"] for query in pages] == ["1", "2", "3"]
+    assert all(query["category"] == "12" for query in pages)
+
+
+def test_stops_at_max_pages(store):
+    _, products = fetch(f"{store}/product-category/engagement-rings/", max_pages=2)
+    assert len(products) == 4
+
+
+def test_not_woocommerce(store):
+    assert fetch(f"{store}/plain/") is None
+
+
+def test_unknown_category_falls_back_to_browser(store):
+    assert fetch(f"{store}/jewellery/") is None
+    assert not any(path == STORE_API_PATH and "page" in query for path, query in FixtureStore.requests)
@@ -0,0 +1,110 @@
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageOps
+from image_store import file_digest, get_image_store
+
+# Workbooks show 100x100 pictures, so they embed ~200px JPEG thumbnails instead of
+# the downloaded file. Decoding runs in a process pool; JPEGs use draft() to let the
+# decoder scale by 1/2..1/8 and other formats are shrunk with reduce() before the
+# final resample. Thumbnails are cached next to the original in the image store.
+# A 64-bit dHash of each thumbnail is computed in the same job (see image_index).
+THUMBNAIL_SIZE = int(os.getenv("THUMBNAIL_SIZE", 200))
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", 80))
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", os.cpu_count() or 1))
+HASH_SIZE = 8
+
+_thumbnail_pool = None
+
+
+def get_thumbnail_pool():
+    """Return the process pool shared by every thumbnail job, creating it on first use."""
+    global _thumbnail_pool
+    if _thumbnail_pool is None:
+        _thumbnail_pool = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+    return _thumbnail_pool
+
+
+def make_thumbnail(source, destination, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """Write a JPEG of at most size x size pixels for source; returns destination."""
+    with Image.open(source) as image:
+        # JPEG fast path: decode straight at a reduced scale
+        image.draft("RGB", (size, size))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            transparent = "A" in image.getbands() or "transparency" in image.info
+            image = image.convert("RGBA" if transparent else "RGB")
+
+        factor = min(image.width // size, image.height // size)
+        if factor >= 2:
+            image = image.reduce(factor)
+        image.thumbnail((size, size), Image.LANCZOS)
+
+        if image.mode == "RGBA":
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+
+        tmp_path = f"{destination}.{os.getpid()}.tmp"
+        image.save(tmp_path, "JPEG", quality=quality, optimize=True)
+    os.replace(tmp_path, destination)
+    return destination
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """Difference hash: one bit per pixel pair, set when a pixel is brighter than its right neighbour."""
+    width = hash_size + 1
+    pixels = image.convert("L").resize((width, hash_size), Image.LANCZOS).tobytes()
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[row * width + col] > pixels[row * width + col + 1])
+    return value
+
+
+def make_thumbnail_and_hash(source, destination, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """Make the thumbnail unless it is cached, then return (destination, dhash of the thumbnail)."""
+    if not os.path.exists(destination):
+        make_thumbnail(source, destination, size, quality)
+    with Image.open(destination) as image:
+        return destination, dhash(image)
+
+
+def thumbnail_path(image_path, digest=None, size=THUMBNAIL_SIZE):
+    """Cache location of a thumbnail: by content digest in the image store, else beside the image."""
+    if digest:
+        return os.path.join(get_image_store().root, "thumbs", digest[:2], f"{digest}_{size}.jpg")
+    return f"{os.path.splitext(image_path)[0]}_thumb{size}.jpg"
+
+
+async def _destination(image_path, digest, size):
+    if digest is None:
+        digest = await asyncio.to_thread(file_digest, image_path)
+    destination = thumbnail_path(image_path, digest, size)
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    return destination
+
+
+async def thumbnail(image_path, digest=None, size=THUMBNAIL_SIZE):
+    """Return a cached or freshly made thumbnail of image_path, or None if it cannot be decoded."""
+    try:
+        destination = await _destination(image_path, digest, size)
+        if os.path.exists(destination):
+            return destination
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_thumbnail_pool(), make_thumbnail, image_path, destination, size)
+    except Exception as e:
+        logging.error(f"Thumbnail failed for {image_path}: {e}")
+        return None
+
+
+async def thumbnail_hash(image_path, digest=None, size=THUMBNAIL_SIZE):
+    """Like thumbnail() but returns (thumbnail_path, dhash), or (None, None) on failure."""
+    try:
+        destination = await _destination(image_path, digest, size)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_thumbnail_pool(), make_thumbnail_and_hash, image_path, destination, size)
+    except Exception as e:
+        logging.error(f"Thumbnail failed for {image_path}: {e}")
+        return None, None
@@ -0,0 +1,153 @@
+import html
+import logging
+from urllib.parse import urlparse
+import httpx
+from bs4 import BeautifulSoup
+
+STORE_API_PATH = "/wp-json/wc/store/products"
+STORE_API_PAGE_SIZE = 100
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36",
+    "Accept": "application/json, text/html;q=0.9",
+}
+
+
+def store_api_base(url):
+    """Return the scheme://host prefix used for Store API calls."""
+    parts = urlparse(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def category_slug(url):
+    """Return the category slug of a /product-category/<slug>/ or /<slug>/ catalogue URL."""
+    segments = [s for s in urlparse(url).path.split("/") if s]
+    # Drop trailing /page/N/ pagination segments
+    if len(segments) >= 2 and segments[-2] == "page" and segments[-1].isdigit():
+        segments = segments[:-2]
+    return segments[-1] if segments else None
+
+
+def format_price(prices):
+    """Format a Store API `prices` object like the storefront does (e.g. "$1,299.00")."""
+    if not prices or not prices.get("price"):
+        return "N/A"
+    minor_unit = int(prices.get("currency_minor_unit", 2))
+    amount = int(prices["price"]) / (10 ** minor_unit)
+    prefix = prices.get("currency_prefix", prices.get("currency_symbol", ""))
+    suffix = prices.get("currency_suffix", "")
+    return f"{prefix}{amount:,.{minor_unit}f}{suffix}"
+
+
+def map_product(item):
+    """Map a Store API product into the product dict used by the handlers."""
+    images = item.get("images") or []
+    image_url = images[0].get("src") if images else None
+    name = html.unescape(item.get("name") or "").strip()
+    return {
+        "product_name": name or "N/A",
+        "price": format_price(item.get("prices")),
+        "image_url": image_url or "N/A",
+        "sku": item.get("sku") or None,
+    }
+
+
+async def detect_woocommerce(client, url):
+    """
+    Return the page title if url is served by WooCommerce with the Store API enabled, else None.
+    """
+    try:
+        response = await client.get(url)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logging.warning(f"WooCommerce detection failed for {url}: {e}")
+        return None
+
+    link_header = response.headers.get("link", "")
+    if "woocommerce" not in response.text and "api.w.org" not in link_header:
+        return None
+
+    try:
+        probe = await client.get(f"{store_api_base(url)}{STORE_API_PATH}", params={"per_page": 1})
+        if probe.status_code != 200 or not isinstance(probe.json(), list):
+            return None
+    except (httpx.HTTPError, ValueError) as e:
+        logging.warning(f"WooCommerce Store API not available for {url}: {e}")
+        return None
+
+    soup = BeautifulSoup(response.text, "html.parser")
+    return soup.title.get_text(strip=True) if soup.title else "N/A"
+
+
+async def resolve_category_id(client, url):
+    """Look up the Store API category id of the catalogue URL's slug; None when it is not a product category."""
+    slug = category_slug(url)
+    if not slug:
+        return None
+
+    page = 1
+    while True:
+        try:
+            response = await client.get(
+                f"{store_api_base(url)}{STORE_API_PATH}/categories",
+                params={"per_page": STORE_API_PAGE_SIZE, "page": page},
+            )
+            response.raise_for_status()
+            categories = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            logging.warning(f"Store API categories failed for {url}: {e}")
+            return None
+        if not isinstance(categories, list):
+            return None
+        for category in categories:
+            if category.get("slug") == slug:
+                return category.get("id")
+        if len(categories) < STORE_API_PAGE_SIZE:
+            return None
+        page += 1
+
+
+async def fetch_woocommerce_products(url, max_pages, page_size=STORE_API_PAGE_SIZE, on_response=None):
+    """
+    Read a WooCommerce catalogue through the Store API.
+
+    Returns (page_title, products) or None when the site is not WooCommerce or the
+    URL is not a product category the Store API knows, so the caller can fall back
+    to rendering the catalogue in the browser. on_response, when
+    given, is awaited with (request_url, items, page_title) for every Store API page.
+    """
+    async with httpx.AsyncClient(headers=HEADERS, timeout=30.0, follow_redirects=True) as client:
+        page_title = await detect_woocommerce(client, url)
+        if page_title is None:
+            return None
+
+        params = {"per_page": page_size}
+        if category_slug(url):
+            category_id = await resolve_category_id(client, url)
+            if category_id is None:
+                # Paging the whole shop would not be this listing
+                logging.info(f"{url} is not a Store API product category, using the browser")
+                return None
+            params["category"] = category_id
+
+        products = []
+        for page in range(1, max_pages + 1):
+            params["page"] = page
+            try:
+                response = await client.get(f"{store_api_base(url)}{STORE_API_PATH}", params=params)
+                response.raise_for_status()
+                items = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                logging.warning(f"Store API page {page} failed for {url}: {e}")
+                break
+
+            logging.info(f"Store API page {page}: {len(items)} products")
+            if on_response:
+                await on_response(str(response.url), items, page_title)
+            products.extend(map_product(item) for item in items)
+            if len(items) < page_size:
+                break
+
+        if not products:
+            return None
+        return page_title, products
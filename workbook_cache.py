@@ -0,0 +1,64 @@
+import os
+import json
+import glob
+import hashlib
+import logging
+import threading
+from collections import namedtuple
+from records import ProductRecord
+from workbooks import render_workbook
+from database import get_products_fingerprint, iter_products
+
+# Workbooks are rendered from IBM_Algo_Webstudy_Products when someone asks for them,
+# for a scrape, a retailer and/or a CurrentDate range. Each rendering is cached as
+# cache/<query hash>_<data version>.xlsx; the version hashes the rows' count, latest
+# Time and ready-image count, so new rows or finished image backfills produce a new
+# file and the stale one is removed. Old cache files also fall under retention.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKBOOK_CACHE_PATH = os.getenv("WORKBOOK_CACHE_PATH", os.path.join(BASE_DIR, "static", "ExcelData", "cache"))
+
+WorkbookQuery = namedtuple("WorkbookQuery", ["scrape_id", "retailer", "date_from", "date_to"], defaults=(None,) * 4)
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def query_hash(query):
+    return hashlib.sha256(json.dumps(query._asdict(), sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def download_name(query):
+    if query.scrape_id and not any(query[1:]):
+        return f"scrape_{query.scrape_id}.xlsx"
+    return f"products_{query_hash(query)}.xlsx"
+
+
+def _lock_for(key):
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+async def cached_workbook(query):
+    """Path of an up-to-date workbook for query, rendering it only if the rows changed; None when nothing matches."""
+    filters = query._asdict()
+    fingerprint = get_products_fingerprint(**filters)
+    if not fingerprint or not fingerprint[0]:
+        return None
+
+    key = query_hash(query)
+    version = hashlib.sha256(repr(fingerprint).encode("utf-8")).hexdigest()[:12]
+    file_path = os.path.join(WORKBOOK_CACHE_PATH, f"{key}_{version}.xlsx")
+    # Requests run on their own threads and loops; the lock keeps concurrent
+    # requests for the same query from rendering it twice
+    with _lock_for(key):
+        if os.path.exists(file_path):
+            logging.info(f"Workbook cache hit for {dict(filters)}")
+            return file_path
+        await render_workbook((ProductRecord.from_db(row) for row in iter_products(**filters)), file_path)
+        for stale in glob.glob(os.path.join(WORKBOOK_CACHE_PATH, f"{key}_*.xlsx")):
+            if stale != file_path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+    return file_path
@@ -0,0 +1,61 @@
+import os
+import time
+import asyncio
+import logging
+from itertools import islice
+from openpyxl import Workbook
+from openpyxl.drawing.image import Image
+from records import SHEET_HEADERS, IMAGE_READY
+from thumbnails import thumbnail
+
+# Workbooks are renderings of ProductRecords, not where rows are collected. They are
+# rendered from the database on request (see workbook_cache), or with INLINE_WORKBOOKS
+# at the end of a scrape and again once the image backfill has the pictures.
+# Rendering uses openpyxl's write-only mode: rows are streamed to a temporary sheet
+# file as they are appended and the xlsx is zipped once, so memory stays flat.
+RENDER_CHUNK = 500
+
+
+def has_image(record):
+    return record.image_status == IMAGE_READY and record.image_path not in (None, "N/A")
+
+
+async def render_workbook(records, file_path):
+    """Write records to file_path, embedding thumbnails for rows whose image is ready."""
+    wb = Workbook(write_only=True)
+    sheet = wb.create_sheet("Products")
+    sheet.append(SHEET_HEADERS)
+
+    rows = images = 0
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, RENDER_CHUNK))
+        if not chunk:
+            break
+        # Thumbnails of one chunk are made concurrently, then its rows are streamed out
+        thumbs = await asyncio.gather(*(thumbnail(record.image_path) if has_image(record) else asyncio.sleep(0)
+                                        for record in chunk))
+        for record, thumb_path in zip(chunk, thumbs):
+            rows += 1
+            sheet.append(record.sheet_row())
+            if not thumb_path:
+                continue
+            try:
+                img = Image(thumb_path)
+                img.width, img.height = 100, 100
+                sheet.add_image(img, f"D{rows + 1}")
+                images += 1
+            except Exception as img_error:
+                logging.error(f"Error adding image to Excel: {img_error}")
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    started = time.perf_counter()
+    # Save beside the target and swap it in, so a download never sees a half-written file
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    await asyncio.to_thread(wb.save, tmp_path)
+    os.replace(tmp_path, file_path)
+    logging.info(
+        f"Workbook saved in {time.perf_counter() - started:.2f}s, "
+        f"{os.path.getsize(file_path) / 1024:.0f} KB for {rows} rows ({images} with images)"
+    )
+    return file_path